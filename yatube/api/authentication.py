@@ -0,0 +1,36 @@
+"""
+Аутентификация по токену с кешем.
+
+Стандартная TokenAuthentication на каждый запрос делает JOIN Token + User.
+Здесь пользователь по токену кладётся в общий кеш на
+API_TOKEN_CACHE_TIMEOUT секунд, и повторные запросы обходятся без БД.
+Запись сбрасывается сигналами (api/signals.py) при удалении токена и при
+любом изменении пользователя, в том числе при его деактивации.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+
+def token_cache_key(key):
+    # В ключе кеша не храним сам токен
+    return 'api:token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        user = cache.get(cache_key)
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(cache_key, user, settings.API_TOKEN_CACHE_TIMEOUT)
+            return user, token
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        return user, self.get_model()(key=key, user=user)
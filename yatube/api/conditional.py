@@ -0,0 +1,54 @@
+"""
+Условные GET-запросы (ETag / Last-Modified) для списков API.
+
+Валидаторы строятся из версий областей кеша (posts/cache.py), которые
+сигналы сдвигают при любом изменении постов, групп и комментариев.
+Проверка стоит одно обращение к кешу: если клиент прислал актуальные
+If-None-Match или If-Modified-Since, ответ 304 уходит без запросов
+к БД и без сериализации.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from posts import cache
+
+
+class ConditionalGetMixin:
+    """Отвечает 304 на list и retrieve, если данные не менялись."""
+
+    def get_cache_scopes(self):
+        """Области кеша, от которых зависит ответ."""
+        raise NotImplementedError
+
+    def get_validators(self, request):
+        state = cache.get_state(*self.get_cache_scopes())
+        digest = hashlib.md5(
+            '|'.join((
+                request.get_full_path(),
+                request.accepted_renderer.format,
+                str(request.user.pk),
+                repr([version for version, _ in state]),
+            )).encode()
+        ).hexdigest()
+        return quote_etag(digest), int(max(changed for _, changed in state))
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,50 @@
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+def parse_moment(name, value):
+    """Дата или дата со временем из параметра запроса."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValidationError(
+                {name: 'Ожидается дата в формате ISO 8601.'}
+            )
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class DateRangeFilter(BaseFilterBackend):
+    """
+    Фильтр по автору и диапазону дат:
+    ?author=<username>&<field>_after=<дата>&<field>_before=<дата>.
+
+    Поле даты задаётся атрибутом date_filter_field вьюсета, остальные
+    простые фильтры — словарём filter_params {параметр: lookup}.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        lookups = {}
+        for param, lookup in getattr(view, 'filter_params', {}).items():
+            value = params.get(param)
+            if value:
+                lookups[lookup] = value
+        field = view.date_filter_field
+        after = params.get(f'{field}_after')
+        if after:
+            lookups[f'{field}__gte'] = parse_moment(f'{field}_after', after)
+        before = params.get(f'{field}_before')
+        if before:
+            lookups[f'{field}__lt'] = parse_moment(f'{field}_before', before)
+        try:
+            return queryset.filter(**lookups)
+        except ValueError:
+            raise ValidationError('Неверное значение фильтра.')
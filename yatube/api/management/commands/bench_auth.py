@@ -0,0 +1,54 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from api.authentication import CachedTokenAuthentication
+from core.benchmarks import rolled_back
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает TokenAuthentication и CachedTokenAuthentication: '
+        'время и число запросов к БД на одну аутентификацию'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ops', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        ops = options['ops']
+        self.stdout.write(
+            f'{"backend":<10} {"мкс/запрос":>12} {"SQL/запрос":>12}'
+        )
+        # Пользователь и токен создаются только на время замера
+        with rolled_back():
+            user = User.objects.create_user(username='bench-auth')
+            token = Token.objects.create(user=user)
+            request = APIRequestFactory().get(
+                '/api/v1/posts/',
+                HTTP_AUTHORIZATION=f'Token {token.key}',
+            )
+            for name, backend in (
+                ('token', TokenAuthentication()),
+                ('cached', CachedTokenAuthentication()),
+            ):
+                elapsed, queries = self.measure(backend, request, ops)
+                self.stdout.write(
+                    f'{name:<10} {elapsed:>12.1f} {queries:>12.2f}'
+                )
+
+    def measure(self, backend, request, ops):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for _ in range(ops):
+                backend.authenticate(request)
+            elapsed = time.perf_counter() - started
+        return elapsed / ops * 1e6, len(queries) / ops
@@ -0,0 +1,71 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api.middleware import available_codings
+from api.renderers import FastJSONRenderer
+from api.rows import PostRowSerializer
+from core.benchmarks import rolled_back
+from posts.models import Post
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает JSONRenderer и FastJSONRenderer на странице постов '
+        'и размер ответа без сжатия, с gzip и brotli'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100,
+                            help='Постов на странице')
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        request = APIRequestFactory().get(
+            '/api/v1/posts/', HTTP_HOST='localhost'
+        )
+        # Посты создаются только на время замера
+        with rolled_back():
+            author = User.objects.create_user(username='bench-renderer')
+            Post.objects.bulk_create(
+                Post(text=f'Пост номер {i}. ' * 10, author=author)
+                for i in range(options['rows'])
+            )
+            rows = PostRowSerializer({'request': request})
+            data = {
+                'next': None,
+                'previous': None,
+                'results': rows.many(rows.values(
+                    Post.objects.filter(author=author)
+                )),
+            }
+        self.stdout.write(f'{"renderer":<20} {"мкс":>10}')
+        for renderer in (JSONRenderer(), FastJSONRenderer()):
+            elapsed, content = self.measure(
+                lambda: renderer.render(data), options['repeat']
+            )
+            name = type(renderer).__name__
+            self.stdout.write(f'{name:<20} {elapsed:>10.1f}')
+        self.stdout.write(
+            f'\n{"encoding":<20} {"байт":>10} {"мкс":>10}'
+        )
+        self.stdout.write(f'{"identity":<20} {len(content):>10} {0:>10.1f}')
+        for coding, compress in available_codings().items():
+            elapsed, compressed = self.measure(
+                lambda: compress(content), options['repeat']
+            )
+            self.stdout.write(
+                f'{coding:<20} {len(compressed):>10} {elapsed:>10.1f}'
+            )
+
+    def measure(self, func, repeat):
+        """Среднее время вызова в микросекундах и последний результат."""
+        started = time.perf_counter()
+        for _ in range(repeat):
+            result = func()
+        return (time.perf_counter() - started) / repeat * 1e6, result
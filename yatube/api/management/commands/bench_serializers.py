@@ -0,0 +1,84 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api.rows import PostRowSerializer
+from api.serializers import PostSerializer
+from core.benchmarks import rolled_back
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает PostSerializer и быстрый PostRowSerializer на списках '
+        'постов: время, число запросов и совпадение JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[100, 1000, 10000]
+        )
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        request = APIRequestFactory().get(
+            '/api/v1/posts/', HTTP_HOST='localhost'
+        )
+        context = {'request': request}
+        self.stdout.write(
+            f'{"rows":>6} {"serializer":<12} {"мс":>10} {"SQL":>5}'
+        )
+        # Посты создаются только на время замера
+        with rolled_back():
+            author = User.objects.create_user(username='bench-serializers')
+            group = Group.objects.create(
+                title='bench', slug='bench-serializers', description='bench'
+            )
+            created = 0
+            for size in sorted(options['sizes']):
+                Post.objects.bulk_create(
+                    Post(
+                        text=f'Пост {i}', author=author,
+                        group=group if i % 2 else None,
+                        image=f'posts/{i}.jpg' if i % 3 == 0 else '',
+                    )
+                    for i in range(created, size)
+                )
+                created = size
+                queryset = Post.objects.with_related().filter(author=author)
+                rows = PostRowSerializer(context)
+                results = {}
+                # queryset.all() — каждый прогон заново читает из БД
+                for name, render in (
+                    ('model', lambda: PostSerializer(
+                        queryset.all(), many=True, context=context
+                    ).data),
+                    ('rows', lambda: rows.many(rows.values(queryset))),
+                ):
+                    elapsed, queries, data = self.measure(
+                        render, options['repeat']
+                    )
+                    results[name] = JSONRenderer().render(data)
+                    self.stdout.write(
+                        f'{size:>6} {name:<12} {elapsed:>10.1f} {queries:>5}'
+                    )
+                if results['model'] != results['rows']:
+                    raise CommandError(f'JSON отличается на {size} строках')
+
+    def measure(self, render, repeat):
+        """Лучшее время из repeat прогонов, в миллисекундах."""
+        best = None
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                data = render()
+                elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best * 1e3, len(queries), data
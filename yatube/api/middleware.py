@@ -0,0 +1,104 @@
+"""
+Сжатие ответов API.
+
+Ответы /api/ крупнее API_COMPRESS_MIN_SIZE байт сжимаются brotli
+(если установлен пакет brotli) или gzip — тем, что клиент принимает
+в Accept-Encoding с большим q. Мелкие ответы отдаются как есть: на них
+заголовки сжатия съедают почти весь выигрыш.
+"""
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BROTLI_QUALITY = 5
+
+
+def _brotli(content):
+    return brotli.compress(content, quality=BROTLI_QUALITY)
+
+
+def available_codings():
+    """Поддерживаемые кодировки в порядке предпочтения сервера."""
+    codings = {'gzip': compress_string}
+    if brotli is not None:
+        codings = {'br': _brotli, **codings}
+    return codings
+
+
+def accepted_codings(header):
+    """Кодировки из Accept-Encoding с q > 0: {'gzip': 1.0, ...}."""
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return {coding: q for coding, q in accepted.items() if q > 0}
+
+
+def choose_coding(header, codings):
+    accepted = accepted_codings(header)
+    wildcard = accepted.get('*', 0)
+    best, best_quality = None, 0
+    for coding in codings:
+        quality = accepted.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class APICompressionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.codings = available_codings()
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if self.is_api(request) and self.should_compress(response):
+            self.compress(request, response)
+        return response
+
+    def is_api(self, request):
+        match = getattr(request, 'resolver_match', None)
+        return match is not None and 'api' in match.namespaces
+
+    def should_compress(self, response):
+        return (
+            not response.streaming
+            and not response.has_header('Content-Encoding')
+            and len(response.content) >= settings.API_COMPRESS_MIN_SIZE
+        )
+
+    def compress(self, request, response):
+        # Ответ зависит от Accept-Encoding, даже если сжатия не было
+        patch_vary_headers(response, ('Accept-Encoding',))
+        coding = choose_coding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''), self.codings
+        )
+        if coding is None:
+            return
+        compressed = self.codings[coding](response.content)
+        if len(compressed) >= len(response.content):
+            return
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = coding
+        # Сжатое тело отличается от исходного побайтно: ETag становится
+        # слабым, как в GZipMiddleware
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
@@ -0,0 +1,17 @@
+from rest_framework.pagination import CursorPagination
+
+
+class PostCursorPagination(CursorPagination):
+    """Курсор по индексу (pub_date, id): без COUNT(*) и OFFSET."""
+    ordering = ('-pub_date', '-id')
+    page_size = 10
+    page_size_query_param = 'page_size'
+    # Один клиент не заставит воркер сериализовать всю таблицу
+    max_page_size = 100
+
+
+class CommentCursorPagination(CursorPagination):
+    ordering = ('created', 'id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
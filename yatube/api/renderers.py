@@ -0,0 +1,82 @@
+"""
+JSON-рендерер на быстром кодировщике.
+
+Если установлен orjson (или ujson), компактный JSON собирается им,
+иначе — стандартным json, как в JSONRenderer DRF. Вывод совпадает
+с JSONRenderer: без пробелов, UTF-8 без \\u-экранирования, с экранированными
+U+2028 и U+2029. Отступы (?format=json; indent=4 и Browsable API)
+по-прежнему рисует стандартный json.
+
+    REST_FRAMEWORK = {
+        'DEFAULT_RENDERER_CLASSES': [
+            'api.renderers.FastJSONRenderer',
+            'rest_framework.renderers.BrowsableAPIRenderer',
+        ],
+    }
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+def _orjson_dumps(data, default):
+    return orjson.dumps(data, default=default)
+
+
+def _ujson_dumps(data, default):
+    return ujson.dumps(
+        data, ensure_ascii=False, escape_forward_slashes=False,
+        default=default,
+    ).encode()
+
+
+# U+2028 и U+2029 в UTF-8: JSONRenderer экранирует их для JavaScript
+LINE_SEPARATOR = '\u2028'.encode()
+PARAGRAPH_SEPARATOR = '\u2029'.encode()
+
+ENCODERS = {}
+if orjson is not None:
+    ENCODERS['orjson'] = _orjson_dumps
+if ujson is not None:
+    ENCODERS['ujson'] = _ujson_dumps
+
+
+class FastJSONRenderer(JSONRenderer):
+    # Первый доступный из перечисленных кодировщиков
+    encoders = ('orjson', 'ujson')
+
+    def __init__(self):
+        super().__init__()
+        self.dumps = next(
+            (ENCODERS[name] for name in self.encoders if name in ENCODERS),
+            None,
+        )
+        # Типы, которых кодировщик не знает (Decimal, UUID, ленивые
+        # строки), переводит тот же JSONEncoder, что и в DRF
+        self.default = self.encoder_class().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            data is None
+            or self.dumps is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = self.dumps(data, self.default)
+        except (TypeError, ValueError, OverflowError):
+            # Например, нестроковые ключи словаря или очень большие числа
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace(LINE_SEPARATOR, b'\\u2028').replace(
+            PARAGRAPH_SEPARATOR, b'\\u2029'
+        )
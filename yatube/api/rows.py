@@ -0,0 +1,114 @@
+"""
+Быстрое чтение списков и отдельных объектов API.
+
+ModelSerializer на каждый элемент создаёт экземпляр модели и проходит
+по всем полям сериализатора. Для чтения это лишнее: здесь queryset
+выбирает только нужные колонки через values() (автор — JOIN на
+author__username), а словари ответа собираются напрямую. Формат
+совпадает с PostSerializer и CommentSerializer до байта; запись по-прежнему
+идёт через обычные сериализаторы.
+"""
+from django.shortcuts import get_object_or_404
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from posts.models import Comment, Post
+
+
+class RowSerializer:
+    """Собирает ответ из строк values(), не создавая моделей."""
+    model = None
+    # Поле ответа -> колонка values(), в порядке полей сериализатора
+    columns = {}
+    datetime_fields = ()
+    file_fields = ()
+
+    def __init__(self, context=None):
+        self.request = (context or {}).get('request')
+        # Дата форматируется тем же полем DRF, что и в сериализаторах
+        self.datetime = serializers.DateTimeField()
+        self.storages = {
+            name: self.model._meta.get_field(name).storage
+            for name in self.file_fields
+        }
+
+    def values(self, queryset):
+        return queryset.values(*self.columns.values())
+
+    def file_url(self, name, value):
+        # Как FileField DRF: пустое имя -> None, иначе абсолютный URL
+        if not value:
+            return None
+        url = self.storages[name].url(value)
+        if self.request is not None:
+            return self.request.build_absolute_uri(url)
+        return url
+
+    def to_representation(self, row):
+        data = {name: row[column] for name, column in self.columns.items()}
+        for name in self.datetime_fields:
+            data[name] = self.datetime.to_representation(data[name])
+        for name in self.file_fields:
+            data[name] = self.file_url(name, data[name])
+        return data
+
+    def many(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+
+class PostRowSerializer(RowSerializer):
+    model = Post
+    columns = {
+        'id': 'id',
+        'text': 'text',
+        'author': 'author__username',
+        'image': 'image',
+        'group': 'group_id',
+        'pub_date': 'pub_date',
+        'views': 'views',
+        'comment_count': 'comment_count',
+    }
+    datetime_fields = ('pub_date',)
+    file_fields = ('image',)
+
+
+class CommentRowSerializer(RowSerializer):
+    model = Comment
+    columns = {
+        'id': 'id',
+        'author': 'author__username',
+        'post': 'post_id',
+        'text': 'text',
+        'created': 'created',
+    }
+    datetime_fields = ('created',)
+
+
+class RowReadMixin:
+    """
+    list и retrieve через row_serializer_class.
+
+    Проверки объектных прав на чтение здесь нет: IsOwnerOrReadOnly
+    пропускает безопасные методы без обращения к объекту.
+    """
+    row_serializer_class = None
+
+    def get_row_serializer(self):
+        return self.row_serializer_class(self.get_serializer_context())
+
+    def list(self, request, *args, **kwargs):
+        rows = self.get_row_serializer()
+        queryset = rows.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(rows.many(page))
+        return Response(rows.many(queryset))
+
+    def retrieve(self, request, *args, **kwargs):
+        rows = self.get_row_serializer()
+        queryset = rows.values(self.filter_queryset(self.get_queryset()))
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        return Response(rows.to_representation(row))
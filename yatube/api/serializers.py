@@ -1,13 +1,23 @@
 from rest_framework import serializers
 
+from posts.bulk import create_posts, update_posts
 from posts.models import Comment, Group, Post, User
 
 
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
+    posts_count = serializers.IntegerField(
+        source='stats.posts_count', read_only=True)
+    comments_count = serializers.IntegerField(
+        source='stats.comments_count', read_only=True)
+    followers_count = serializers.IntegerField(
+        source='stats.followers_count', read_only=True)
+    following_count = serializers.IntegerField(
+        source='stats.following_count', read_only=True)
 
     class Meta:
-        fields = ('id', 'username', 'password',)
+        fields = ('id', 'username', 'password', 'posts_count',
+                  'comments_count', 'followers_count', 'following_count')
         model = User
 
     def create(self, validated_data):
@@ -18,6 +28,22 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
+class BulkPostListSerializer(serializers.ListSerializer):
+    """Сохраняет список постов через bulk_create / bulk_update."""
+
+    def create(self, validated_data):
+        return create_posts(Post(**item) for item in validated_data)
+
+    def update(self, instances, validated_data):
+        # instances идут в том же порядке, что и элементы запроса
+        fields = set()
+        for post, item in zip(instances, validated_data):
+            for name, value in item.items():
+                setattr(post, name, value)
+                fields.add(name)
+        return update_posts(instances, sorted(fields))
+
+
 class PostSerializer(serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         read_only=True,
@@ -25,14 +51,17 @@ class PostSerializer(serializers.ModelSerializer):
     )
 
     class Meta:
-        fields = ('id', 'text', 'author', 'image', 'group', 'pub_date')
+        fields = ('id', 'text', 'author', 'image', 'group', 'pub_date',
+                  'views', 'comment_count')
         model = Post
+        list_serializer_class = BulkPostListSerializer
 
 
 class GroupSerializer(serializers.ModelSerializer):
 
     class Meta:
-        fields = ('id', 'title', 'slug', 'description')
+        fields = ('id', 'title', 'slug', 'description', 'posts_count')
+        read_only_fields = ('posts_count',)
         model = Group
 
 
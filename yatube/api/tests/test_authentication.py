@@ -0,0 +1,54 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from api.authentication import CachedTokenAuthentication
+
+User = get_user_model()
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Author')
+        self.token = Token.objects.create(user=self.user)
+        self.backend = CachedTokenAuthentication()
+
+    def test_token_is_cached(self):
+        """Повторная проверка того же токена обходится без БД."""
+        self.backend.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            user, token = self.backend.authenticate_credentials(
+                self.token.key
+            )
+        self.assertEqual(user, self.user)
+        self.assertEqual(token.key, self.token.key)
+
+    def test_deleted_token_is_rejected(self):
+        """Удалённый токен сразу перестаёт работать."""
+        key = self.token.key
+        self.backend.authenticate_credentials(key)
+        self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.backend.authenticate_credentials(key)
+
+    def test_deactivated_user_is_rejected(self):
+        """Деактивированный пользователь сразу теряет доступ."""
+        self.backend.authenticate_credentials(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.backend.authenticate_credentials(self.token.key)
+
+    def test_api_accepts_token(self):
+        """API принимает токен из заголовка Authorization."""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        response = client.get(reverse('api:group-list'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
@@ -0,0 +1,84 @@
+import gzip
+import json
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.middleware import accepted_codings, choose_coding
+from api.renderers import FastJSONRenderer
+from posts.models import Post
+
+User = get_user_model()
+
+
+class FastJSONRendererTests(TestCase):
+    def test_same_output_as_json_renderer(self):
+        """Вывод совпадает с JSONRenderer побайтно."""
+        data = {
+            'text': 'Привет, "мир" / \u2028 \u2029',
+            'items': [1, 2.5, None, True, Decimal('1.10')],
+            'nested': {'a': []},
+        }
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    def test_indent_falls_back_to_json(self):
+        data = {'a': [1, 2]}
+        media_type = 'application/json; indent=4'
+        self.assertEqual(
+            FastJSONRenderer().render(data, media_type),
+            JSONRenderer().render(data, media_type),
+        )
+
+
+class CompressionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        Post.objects.bulk_create(
+            Post(text=f'Тестовый текст {i}', author=cls.author)
+            for i in range(30)
+        )
+
+    def setUp(self):
+        self.client = APIClient(HTTP_HOST='localhost')
+        self.client.force_authenticate(self.author)
+        self.url = reverse('api:post-list')
+
+    def test_large_response_is_gzipped(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertTrue(response['ETag'].startswith('W/'))
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(data['results']), 10)
+
+    def test_without_accept_encoding(self):
+        response = self.client.get(self.url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    @override_settings(API_COMPRESS_MIN_SIZE=10 ** 6)
+    def test_small_response_is_not_compressed(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_site_pages_are_not_compressed(self):
+        response = self.client.get(
+            reverse('posts:index'), HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_choose_coding(self):
+        codings = ('br', 'gzip')
+        self.assertEqual(choose_coding('gzip, br', codings), 'br')
+        self.assertEqual(choose_coding('br;q=0.5, gzip', codings), 'gzip')
+        self.assertEqual(choose_coding('*', codings), 'br')
+        self.assertIsNone(choose_coding('gzip;q=0, deflate', codings))
+        self.assertEqual(accepted_codings('gzip;q=bad'), {})
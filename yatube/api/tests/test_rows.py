@@ -0,0 +1,76 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.serializers import CommentSerializer, PostSerializer
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class RowSerializerTests(TestCase):
+    """Быстрое чтение отдаёт тот же JSON, что и обычные сериализаторы."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Описание',
+        )
+        cls.post = Post.objects.create(
+            text='С картинкой', author=cls.author, group=cls.group,
+            image='posts/small.gif',
+        )
+        Post.objects.create(text='Без группы', author=cls.author)
+        Comment.objects.create(
+            post=cls.post, author=cls.author, text='Коммент'
+        )
+
+    def setUp(self):
+        self.client = APIClient(HTTP_HOST='localhost')
+        self.client.force_authenticate(self.author)
+        request = APIRequestFactory().get('/', HTTP_HOST='localhost')
+        self.context = {'request': request}
+
+    def render(self, data):
+        return json.loads(JSONRenderer().render(data))
+
+    def test_post_list(self):
+        response = self.client.get(reverse('api:post-list'))
+        expected = PostSerializer(
+            Post.objects.order_by('-pub_date', '-id'),
+            many=True, context=self.context,
+        ).data
+        self.assertEqual(
+            response.json()['results'], self.render(expected)
+        )
+
+    def test_post_detail(self):
+        response = self.client.get(
+            reverse('api:post-detail', args=[self.post.pk])
+        )
+        post = Post.objects.get(pk=self.post.pk)
+        expected = PostSerializer(post, context=self.context).data
+        self.assertEqual(response.json(), self.render(expected))
+
+    def test_comment_list(self):
+        response = self.client.get(
+            reverse('api:comment-list', args=[self.post.pk])
+        )
+        expected = CommentSerializer(
+            self.post.comments.all(), many=True, context=self.context
+        ).data
+        self.assertEqual(
+            response.json()['results'], self.render(expected)
+        )
+
+    def test_missing_post(self):
+        response = self.client.get(reverse('api:post-detail', args=[0]))
+        self.assertEqual(response.status_code, 404)
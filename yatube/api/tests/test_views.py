@@ -0,0 +1,265 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from posts.models import (AuthorStats, Comment, Follow, Group, Post,
+                          TimelineEntry)
+
+User = get_user_model()
+
+
+class PostListTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.other = User.objects.create_user(username='Other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Описание',
+        )
+        for i in range(15):
+            Post.objects.create(
+                text=f'Тестовый текст {i}',
+                author=cls.author,
+                group=cls.group if i % 3 == 0 else None,
+            )
+        cls.other_post = Post.objects.create(text='Чужой', author=cls.other)
+        for i in range(25):
+            Comment.objects.create(
+                post=cls.other_post, author=cls.author, text=f'Коммент {i}'
+            )
+        cls.url = reverse('api:post-list')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def test_posts_are_paginated(self):
+        """Список постов отдаётся страницами с курсором."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(len(response.data['results']), 10)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 6)
+        self.assertIsNone(response.data['next'])
+
+    def test_page_size_is_bounded(self):
+        """Размер страницы нельзя поднять выше max_page_size."""
+        Post.objects.bulk_create(
+            Post(text='Ещё', author=self.author) for _ in range(120)
+        )
+        response = self.client.get(self.url, {'page_size': 100000})
+        self.assertEqual(len(response.data['results']), 100)
+
+    def test_posts_filters(self):
+        """Посты фильтруются по группе, автору и дате публикации."""
+        now = timezone.now()
+        cases = (
+            ({'group': self.group.pk}, 5),
+            ({'author': self.other.username}, 1),
+            ({'pub_date_after': (now - timedelta(days=1)).isoformat()}, 10),
+            ({'pub_date_before': (now - timedelta(days=1)).date()}, 0),
+        )
+        for params, expected in cases:
+            with self.subTest(params=params):
+                response = self.client.get(
+                    self.url, {**params, 'page_size': 10}
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(len(response.data['results']), expected)
+
+    def test_bad_filter_values(self):
+        for params in ({'group': 'abc'}, {'pub_date_after': 'вчера'}):
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(
+                    response.status_code, HTTPStatus.BAD_REQUEST
+                )
+
+    def test_comments_are_paginated(self):
+        url = reverse(
+            'api:comment-list', kwargs={'post_id': self.other_post.pk}
+        )
+        response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEqual(
+            response.data['results'][0]['text'], 'Коммент 0'
+        )
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_comment_create_reads_post_once(self):
+        """Пост для нового комментария читается из БД один раз."""
+        url = reverse(
+            'api:comment-list', kwargs={'post_id': self.other_post.pk}
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {'text': 'Новый'})
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        post_reads = [
+            query for query in queries
+            if query['sql'].startswith('SELECT')
+            and '"posts_post"."image"' in query['sql']
+        ]
+        self.assertEqual(len(post_reads), 1)
+
+    def test_comment_count_in_posts(self):
+        response = self.client.get(
+            reverse('api:post-detail', args=[self.other_post.pk])
+        )
+        self.assertEqual(response.data['comment_count'], 25)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.post = Post.objects.create(text='Текст', author=cls.author)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def test_not_modified_until_data_changes(self):
+        """Пока данные не менялись, повторный запрос получает 304."""
+        urls = (
+            reverse('api:post-list'),
+            reverse('api:group-list'),
+            reverse('api:comment-list', kwargs={'post_id': self.post.pk}),
+        )
+        etags = {}
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                etags[url] = response['ETag']
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+                response = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+        Comment.objects.create(post=self.post, author=self.author, text='!')
+        Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(text='Новый', author=self.author)
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_not_modified_skips_queries(self):
+        """Ответ 304 не обращается к БД."""
+        url = reverse('api:post-list')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+
+class BulkPostTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.follower = User.objects.create_user(username='Follower')
+        cls.other = User.objects.create_user(username='Other')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Follow.objects.create(user=cls.follower, author=cls.author)
+        cls.url = reverse('api:post-bulk')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def test_bulk_create_json(self):
+        """Массив постов создаётся целиком, с лентами и счётчиками."""
+        items = [
+            {'text': f'Пост {i}', 'group': self.group.pk} for i in range(5)
+        ]
+        response = self.client.post(self.url, items, format='json')
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        ids = [item['id'] for item in response.data]
+        self.assertEqual(
+            list(
+                Post.objects.filter(pk__in=ids)
+                .order_by('pk').values_list('text', flat=True)
+            ),
+            [item['text'] for item in items]
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.follower).count(), 5
+        )
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 5
+        )
+        self.assertEqual(Group.objects.get(pk=self.group.pk).posts_count, 5)
+
+    def test_bulk_create_ndjson(self):
+        body = '{"text": "Первый"}\n\n{"text": "Второй"}\n'
+        response = self.client.post(
+            self.url, body, content_type='application/x-ndjson'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        self.assertEqual(len(response.data), 2)
+
+    def test_bulk_create_reports_item_errors(self):
+        """Ошибки привязаны к номерам элементов, записи не создаются."""
+        items = [{'text': 'Хороший'}, {'text': ''}, {'group': 999}]
+        response = self.client.post(self.url, items, format='json')
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(
+            [error['index'] for error in response.data['errors']], [1, 2]
+        )
+        self.assertFalse(Post.objects.exists())
+
+    def test_bulk_rejects_bool_ids(self):
+        """true и false не принимаются за id постов 1 и 0."""
+        post = Post.objects.create(text='Свой', author=self.author)
+        response = self.client.delete(self.url, [True], format='json')
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertTrue(Post.objects.filter(pk=post.pk).exists())
+
+    def test_bulk_update_and_delete_check_owner(self):
+        """Чужие посты нельзя ни править, ни удалять."""
+        own = Post.objects.create(text='Свой', author=self.author)
+        alien = Post.objects.create(text='Чужой', author=self.other)
+        response = self.client.patch(
+            self.url,
+            [{'id': own.pk, 'text': 'Правка'}, {'id': alien.pk, 'text': 'X'}],
+            format='json'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        self.assertEqual(response.data['errors'][0]['index'], 1)
+        response = self.client.delete(self.url, [alien.pk], format='json')
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        self.assertTrue(Post.objects.filter(pk=alien.pk).exists())
+
+        response = self.client.patch(
+            self.url,
+            [{'id': own.pk, 'text': 'Правка', 'group': self.group.pk}],
+            format='json'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        own.refresh_from_db()
+        self.assertEqual(own.text, 'Правка')
+        self.assertEqual(Group.objects.get(pk=self.group.pk).posts_count, 1)
+        response = self.client.delete(self.url, [own.pk], format='json')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertFalse(Post.objects.filter(pk=own.pk).exists())
@@ -1,27 +1,173 @@
 # from django.core.exceptions import PermissionDenied
+from django.conf import settings
+from django.db import transaction
 from django.shortcuts import get_object_or_404
-from rest_framework import viewsets, permissions
+from rest_framework import status, viewsets, permissions
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
+from posts import cache
 from posts.models import Group, Post, User
+from posts.search import search as search_posts
+from .conditional import ConditionalGetMixin
+from .filters import DateRangeFilter
+from .pagination import CommentCursorPagination, PostCursorPagination
+from .parsers import NDJSONParser
 from .serializers import (CommentSerializer, GroupSerializer, PostSerializer,
                           UserSerializer)
 from .permissions import IsOwnerOrReadOnly
+from .rows import CommentRowSerializer, PostRowSerializer, RowReadMixin
 
 
-class PostViewSet(viewsets.ModelViewSet):
-    queryset = Post.objects.all()
+class PostViewSet(ConditionalGetMixin, RowReadMixin, viewsets.ModelViewSet):
+    queryset = Post.objects.with_related()
     serializer_class = PostSerializer
+    row_serializer_class = PostRowSerializer
     permission_classes = [
         permissions.IsAuthenticated,
         IsOwnerOrReadOnly
     ]
+    pagination_class = PostCursorPagination
+    filter_backends = [DateRangeFilter]
+    filter_params = {
+        'group': 'group_id',
+        'author': 'author__username',
+    }
+    date_filter_field = 'pub_date'
+
+    def get_cache_scopes(self):
+        # views постов меняется без сигналов, при записи просмотров
+        return [cache.INDEX, cache.VIEWS]
 
     def perform_create(self, serializer):
         serializer.save(
             author=self.request.user,
         )
 
+    @action(detail=False)
+    def search(self, request):
+        """Поиск по полнотекстовому индексу: ?q=запрос[&cursor=...]."""
+        page = search_posts(
+            request.query_params.get('q', ''),
+            settings.PAGES,
+            request.query_params.get('cursor'),
+        )
+        url = request.build_absolute_uri()
+        serializer = self.get_serializer(page.object_list, many=True)
+        return Response({
+            'next': (
+                replace_query_param(url, 'cursor', page.next_cursor)
+                if page.has_next() else None
+            ),
+            'previous': (
+                replace_query_param(url, 'cursor', page.previous_cursor)
+                if page.has_previous() else None
+            ),
+            'results': serializer.data,
+        })
+
+    @action(
+        detail=False,
+        methods=['post', 'patch', 'delete'],
+        parser_classes=[JSONParser, NDJSONParser],
+    )
+    def bulk(self, request):
+        """
+        Массовые операции одной транзакцией: POST создаёт посты,
+        PATCH правит их (у каждого элемента обязателен id), DELETE
+        удаляет посты по списку id. Тело — JSON-массив или NDJSON.
+        Если хоть один элемент не прошёл проверку, ничего не пишется,
+        а ответ перечисляет ошибки по номерам элементов.
+        """
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError('Ожидается массив объектов.')
+        if len(items) > settings.API_BULK_MAX_ITEMS:
+            raise ValidationError(
+                f'Не больше {settings.API_BULK_MAX_ITEMS} элементов за раз.'
+            )
+        if request.method == 'POST':
+            return self._bulk_create(items)
+        return self._bulk_change(request, items)
+
+    def _errors_response(self, errors, status_code):
+        return Response(
+            {'errors': [
+                {'index': index, 'errors': item_errors}
+                for index, item_errors in enumerate(errors) if item_errors
+            ]},
+            status=status_code,
+        )
+
+    def _bulk_create(self, items):
+        serializer = self.get_serializer(data=items, many=True)
+        if not serializer.is_valid():
+            return self._errors_response(
+                serializer.errors, status.HTTP_400_BAD_REQUEST
+            )
+        serializer.save(author=self.request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def _bulk_change(self, request, items):
+        deleting = request.method == 'DELETE'
+        ids = []
+        errors = []
+        for item in items:
+            if deleting:
+                post_id = item
+            elif isinstance(item, dict):
+                post_id = item.get('id')
+            else:
+                post_id = None
+            # bool — подкласс int, но true/false не id
+            if (not isinstance(post_id, int) or isinstance(post_id, bool)
+                    or post_id in ids):
+                errors.append({'id': ['Нужен уникальный целый id поста.']})
+            else:
+                errors.append({})
+            ids.append(post_id)
+        if any(errors):
+            return self._errors_response(errors, status.HTTP_400_BAD_REQUEST)
+        posts = self.get_queryset().in_bulk(ids)
+        forbidden = False
+        for index, post_id in enumerate(ids):
+            post = posts.get(post_id)
+            if post is None:
+                errors[index] = {'id': ['Пост не найден.']}
+                continue
+            # Те же проверки владельца, что и для одиночных запросов
+            for permission in self.get_permissions():
+                if not permission.has_object_permission(request, self, post):
+                    errors[index] = {
+                        'detail': 'Изменение чужого контента запрещено!'
+                    }
+                    forbidden = True
+                    break
+        if any(errors):
+            return self._errors_response(
+                errors,
+                status.HTTP_403_FORBIDDEN if forbidden
+                else status.HTTP_404_NOT_FOUND,
+            )
+        if deleting:
+            with transaction.atomic():
+                Post.objects.filter(pk__in=ids).delete()
+            return Response({'deleted': ids})
+        serializer = self.get_serializer(
+            [posts[post_id] for post_id in ids],
+            data=items, many=True, partial=True,
+        )
+        if not serializer.is_valid():
+            return self._errors_response(
+                serializer.errors, status.HTTP_400_BAD_REQUEST
+            )
+        serializer.save()
+        return Response(serializer.data)
+
     # def perform_update(self, serializer):
     #     if serializer.instance.author != self.request.user:
     #         raise PermissionDenied('Изменение чужого контента запрещено!')
@@ -33,28 +179,46 @@ class PostViewSet(viewsets.ModelViewSet):
     #     super(PostViewSet, self).perform_destroy(instance)
 
 
-class GroupViewSet(viewsets.ReadOnlyModelViewSet):
+class GroupViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Group.objects.all()
     serializer_class = GroupSerializer
 
+    def get_cache_scopes(self):
+        # posts_count групп меняется вместе с постами
+        return [cache.GROUPS, cache.INDEX]
+
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, RowReadMixin,
+                     viewsets.ModelViewSet):
     serializer_class = CommentSerializer
+    row_serializer_class = CommentRowSerializer
     permission_classes = [
         permissions.IsAuthenticated,
         IsOwnerOrReadOnly
     ]
+    pagination_class = CommentCursorPagination
+    filter_backends = [DateRangeFilter]
+    filter_params = {
+        'author': 'author__username',
+    }
+    date_filter_field = 'created'
+
+    def get_cache_scopes(self):
+        return [cache.comments_scope(self.kwargs['post_id'])]
+
+    def get_post(self):
+        # Пост читается один раз на запрос: и для списка, и для создания
+        if not hasattr(self, '_post'):
+            self._post = get_object_or_404(Post, pk=self.kwargs['post_id'])
+        return self._post
 
     def get_queryset(self):
-        post_id = self.kwargs['post_id']
-        post = get_object_or_404(Post, pk=post_id)
-        new_queryset = post.comments.all()
-        return new_queryset
+        return self.get_post().comments.select_related('author')
 
     def perform_create(self, serializer):
         serializer.save(
             author=self.request.user,
-            post=get_object_or_404(Post, pk=self.kwargs['post_id']),
+            post=self.get_post(),
         )
 
     # def perform_update(self, serializer):
@@ -69,7 +233,7 @@ class CommentViewSet(viewsets.ModelViewSet):
 
 
 class UserViewSet(viewsets.ModelViewSet):
-    queryset = User.objects.all()
+    queryset = User.objects.select_related('stats')
     serializer_class = UserSerializer
 
     def get_permissions(self):
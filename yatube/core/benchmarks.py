@@ -0,0 +1,42 @@
+"""Общее для команд-бенчмарков (bench_*)."""
+import math
+from contextlib import contextmanager
+
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, transaction
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """Транзакция, которая всегда откатывается: данные замера не остаются."""
+    try:
+        with transaction.atomic():
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+@contextmanager
+def persistent_connection():
+    """
+    Не даёт обработчику запросов закрывать соединение с БД после ответа
+    (как django.test.Client): иначе транзакция rolled_back() оборвётся.
+    """
+    request_started.disconnect(close_old_connections)
+    request_finished.disconnect(close_old_connections)
+    try:
+        yield
+    finally:
+        request_started.connect(close_old_connections)
+        request_finished.connect(close_old_connections)
+
+
+def percentile(values, share):
+    """Перцентиль отсортированного списка по ближайшему рангу."""
+    index = max(0, math.ceil(share * len(values)) - 1)
+    return values[index]
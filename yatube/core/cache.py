@@ -0,0 +1,260 @@
+"""
+Общий для всех процессов хоста кеш на SQLite в режиме WAL.
+
+LocMemCache живёт внутри одного процесса: при нескольких WSGI-воркерах
+у каждого своя копия фрагментов, а сброс версии в одном воркере
+не виден остальным. Этот бэкенд хранит записи в одном файле SQLite,
+который читают и пишут все процессы; WAL позволяет читать параллельно
+с записью. Размер ограничен числом записей (MAX_ENTRIES) и объёмом
+(OPTIONS['MAX_SIZE'] в байтах), лишнее вытесняется по давности
+последнего обращения (LRU).
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.SQLiteCache',
+            'LOCATION': '/var/tmp/yatube-cache.sqlite3',
+            'OPTIONS': {'MAX_ENTRIES': 100000, 'MAX_SIZE': 256 * 2 ** 20},
+        }
+    }
+"""
+import os
+import pickle
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .sqlite import Immediate, connect
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL,'
+    ' size INTEGER NOT NULL'
+    ')',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+)
+
+ALIVE = '(expires IS NULL OR expires > ?)'
+
+
+class SQLiteCache(BaseCache):
+    # Время последнего обращения обновляется не чаще раза в секунду,
+    # чтобы чтение горячих ключей не превращалось в запись
+    ACCESS_GRANULARITY = 1.0
+    # Проверка лимитов раз в столько записей (в каждом процессе)
+    CULL_CHECK_EVERY = 50
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = int(options.get('MAX_SIZE', 64 * 2 ** 20))
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._local = threading.local()
+        self._writes = 0
+
+    # Соединения
+
+    def _connection(self):
+        local = self._local
+        pid = os.getpid()
+        # После fork соединение родителя использовать нельзя
+        if getattr(local, 'pid', None) != pid:
+            local.conn = connect(self._path, self._busy_timeout, SCHEMA)
+            local.pid = pid
+        return local.conn
+
+    def close(self, **kwargs):
+        # Django закрывает кеши после каждого запроса; соединение с файлом
+        # дешевле держать открытым на всё время жизни потока
+        pass
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    # Чтение
+
+    def _touch_rows(self, conn, keys, now):
+        conn.executemany(
+            'UPDATE cache SET accessed = ? WHERE key = ? AND accessed < ?',
+            [(now, key, now - self.ACCESS_GRANULARITY) for key in keys],
+        )
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute(
+            f'SELECT value, accessed FROM cache WHERE key = ? AND {ALIVE}',
+            (key, now),
+        ).fetchone()
+        if row is None:
+            return default
+        if row[1] < now - self.ACCESS_GRANULARITY:
+            self._touch_rows(conn, [key], now)
+        return pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        key_map = {self._key(key, version): key for key in keys}
+        if not key_map:
+            return {}
+        conn = self._connection()
+        now = time.time()
+        placeholders = ','.join('?' * len(key_map))
+        rows = conn.execute(
+            f'SELECT key, value FROM cache '
+            f'WHERE key IN ({placeholders}) AND {ALIVE}',
+            (*key_map, now),
+        ).fetchall()
+        self._touch_rows(conn, [key for key, _ in rows], now)
+        return {key_map[key]: pickle.loads(value) for key, value in rows}
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._connection().execute(
+            f'SELECT 1 FROM cache WHERE key = ? AND {ALIVE}',
+            (key, time.time()),
+        ).fetchone() is not None
+
+    # Запись
+
+    def _write(self, conn, key, value, timeout, replace=True):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        verb = 'INSERT OR REPLACE' if replace else 'INSERT OR IGNORE'
+        cursor = conn.execute(
+            f'{verb} INTO cache (key, value, expires, accessed, size) '
+            f'VALUES (?, ?, ?, ?, ?)',
+            (key, data, self._expires(timeout), time.time(), len(data)),
+        )
+        return cursor.rowcount
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        conn = self._connection()
+        self._write(conn, key, value, timeout)
+        self._maybe_cull(conn)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        conn = self._connection()
+        with self._transaction(conn):
+            for key, value in data.items():
+                self._write(conn, self._key(key, version), value, timeout)
+        self._maybe_cull(conn)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        conn = self._connection()
+        with self._transaction(conn):
+            conn.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (key, time.time()),
+            )
+            added = self._write(conn, key, value, timeout, replace=False)
+        self._maybe_cull(conn)
+        return bool(added)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        cursor = self._connection().execute(
+            f'UPDATE cache SET expires = ?, accessed = ? '
+            f'WHERE key = ? AND {ALIVE}',
+            (self._expires(timeout), now, key, now),
+        )
+        return bool(cursor.rowcount)
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        conn = self._connection()
+        # Чтение и запись под одной блокировкой: incr атомарен между
+        # процессами, на нём держатся версии фрагментов
+        with self._transaction(conn):
+            row = conn.execute(
+                f'SELECT value FROM cache WHERE key = ? AND {ALIVE}',
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            conn.execute(
+                'UPDATE cache SET value = ?, size = ?, accessed = ? '
+                'WHERE key = ?',
+                (data, len(data), time.time(), key),
+            )
+        return value
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        cursor = self._connection().execute(
+            'DELETE FROM cache WHERE key = ?', (key,)
+        )
+        return bool(cursor.rowcount)
+
+    def delete_many(self, keys, version=None):
+        conn = self._connection()
+        with self._transaction(conn):
+            conn.executemany(
+                'DELETE FROM cache WHERE key = ?',
+                [(self._key(key, version),) for key in keys],
+            )
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    # Вытеснение
+
+    def _transaction(self, conn):
+        return Immediate(conn)
+
+    def _maybe_cull(self, conn):
+        self._writes += 1
+        if self._writes % self.CULL_CHECK_EVERY == 0:
+            self.cull()
+
+    def cull(self):
+        """Удаляет просроченные записи и вытесняет давние сверх лимитов."""
+        conn = self._connection()
+        with self._transaction(conn):
+            conn.execute(
+                'DELETE FROM cache WHERE expires <= ?', (time.time(),)
+            )
+            count, size = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache'
+            ).fetchone()
+            if count <= self._max_entries and size <= self._max_size:
+                return
+            # Как и в стандартных бэкендах, вытесняем сразу долю записей
+            excess = count - self._max_entries
+            share = (
+                count // self._cull_frequency
+                if self._cull_frequency else count
+            )
+            limit = max(excess, share, 1)
+            conn.execute(
+                'DELETE FROM cache WHERE key IN '
+                '(SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                (limit,),
+            )
+            if size > self._max_size:
+                # Добираем по объёму: удаляем давние, пока не влезем в лимит
+                conn.execute(
+                    'DELETE FROM cache WHERE key IN ('
+                    ' SELECT key FROM ('
+                    '  SELECT key, SUM(size) OVER (ORDER BY accessed DESC)'
+                    '  AS kept FROM cache'
+                    ' ) WHERE kept > ?'
+                    ')',
+                    (self._max_size,),
+                )
+
@@ -0,0 +1,115 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache import SQLiteCache
+
+
+def make_backends(directory, max_entries):
+    # Лимит выше числа ключей замера: иначе вытеснение (по умолчанию
+    # MAX_ENTRIES=300) подменяет промахами то, что измеряется
+    params = {'OPTIONS': {'MAX_ENTRIES': max_entries}}
+    return {
+        'locmem': lambda: LocMemCache('bench', params),
+        'filebased': lambda: FileBasedCache(
+            os.path.join(directory, 'files'), params
+        ),
+        'sqlite': lambda: SQLiteCache(
+            os.path.join(directory, 'cache.sqlite3'), params
+        ),
+    }
+
+
+def _worker(factory, keys, value, results):
+    """Воркер читает ключи и заполняет промахи, как фрагменты страниц."""
+    cache = factory()
+    hits = 0
+    for key in keys:
+        if cache.get(key) is None:
+            cache.set(key, value)
+        else:
+            hits += 1
+    results.put(hits)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает LocMemCache, FileBasedCache и SQLiteCache: '
+        'задержку операций и долю попаданий при нескольких процессах'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ops', type=int, default=5000)
+        parser.add_argument('--size', type=int, default=4096,
+                            help='Размер значения в байтах')
+        parser.add_argument('--workers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        ops = options['ops']
+        value = 'x' * options['size']
+        directory = tempfile.mkdtemp()
+        try:
+            backends = make_backends(directory, max_entries=2 * ops)
+            self.stdout.write(
+                f'{"backend":<10} {"set, мкс":>10} {"get, мкс":>10} '
+                f'{"miss, мкс":>10} {"hit ratio":>10}'
+            )
+            for name, factory in backends.items():
+                cache = factory()
+                cache.clear()
+                timings = self.measure(cache, ops, value)
+                cache.clear()
+                ratio = self.shared_hit_ratio(
+                    factory, options['workers'], ops // 10, value
+                )
+                self.stdout.write(
+                    f'{name:<10} {timings[0]:>10.1f} {timings[1]:>10.1f} '
+                    f'{timings[2]:>10.1f} {ratio:>10.2f}'
+                )
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def measure(self, cache, ops, value):
+        keys = [f'key:{i}' for i in range(ops)]
+        result = []
+        for operation in (
+            lambda key: cache.set(key, value),
+            lambda key: cache.get(key),
+            lambda key: cache.get(f'missing:{key}'),
+        ):
+            started = time.perf_counter()
+            for key in keys:
+                operation(key)
+            result.append((time.perf_counter() - started) / ops * 1e6)
+        return result
+
+    def shared_hit_ratio(self, factory, workers, keys_count, value):
+        """
+        Процессы одновременно читают одни и те же ключи; у общего кеша
+        промахов примерно столько, сколько ключей (чуть больше, если
+        процессы промахнулись по ключу одновременно), у LocMemCache —
+        в workers раз больше.
+        """
+        keys = [f'page:{i}' for i in range(keys_count)]
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        processes = [
+            context.Process(
+                target=_worker, args=(factory, keys, value, results)
+            )
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        # Очередь разбираем до join: процесс не завершится, пока его
+        # результат лежит в буфере канала
+        hits = sum(results.get() for _ in processes)
+        for process in processes:
+            process.join()
+        return hits / (workers * keys_count)
@@ -0,0 +1,75 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.benchmarks import persistent_connection, rolled_back
+
+User = get_user_model()
+
+MIDDLEWARES = {
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.RequestProfilingMiddleware',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время страниц без MetricsMiddleware и '
+        'RequestProfilingMiddleware, с ними вне выборки и с полным '
+        'профилем; запускать на заполненной базе'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=300)
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(posts__isnull=False).first()
+        if user is None:
+            raise CommandError('В базе нет постов')
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:profile', args=[user.username]),
+        ]
+        without = [
+            name for name in settings.MIDDLEWARE if name not in MIDDLEWARES
+        ]
+        with persistent_connection(), rolled_back():
+            modes = {}
+            for name, middleware, rate in (
+                ('без middleware', without, 0),
+                ('вне выборки', settings.MIDDLEWARE, 0),
+                ('профиль', settings.MIDDLEWARE, 1.0),
+            ):
+                client = Client(HTTP_HOST='localhost', REMOTE_ADDR='192.0.2.1')
+                client.force_login(user)
+                modes[name] = (client, middleware, rate)
+            times = {name: [] for name in modes}
+            # Режимы чередуются, чтобы дрейф машины делился между ними
+            for index in range(options['repeat'] + 10):
+                for name, (client, middleware, rate) in modes.items():
+                    with override_settings(
+                        MIDDLEWARE=middleware, PROFILING_SAMPLE_RATE=rate
+                    ):
+                        elapsed = self.measure(client, urls)
+                    # Первые прогоны — прогрев кеша и ленивых импортов
+                    if index >= 10:
+                        times[name].append(elapsed)
+        baseline = statistics.median(times['без middleware'])
+        for name, values in times.items():
+            median = statistics.median(values)
+            self.stdout.write(
+                f'{name:<16} {median:8.3f} мс '
+                f'{(median / baseline - 1) * 100:+6.2f}%'
+            )
+
+    def measure(self, client, urls):
+        """Время запроса в миллисекундах (в среднем по urls)."""
+        started = time.perf_counter()
+        for url in urls:
+            client.get(url)
+        return (time.perf_counter() - started) * 1e3 / len(urls)
@@ -0,0 +1,392 @@
+import io
+import json
+import logging
+import time
+import tracemalloc
+from collections import namedtuple
+from urllib.parse import unquote_to_bytes, urlencode
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import HttpRequest
+from django.middleware.csrf import get_token
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from core.benchmarks import percentile, persistent_connection, rolled_back
+from posts import viewcounts
+from posts.models import AuthorStats, Comment, Follow, Group
+
+User = get_user_model()
+
+USERS = ('anon', 'auth')
+PHASES = ('cold', 'warm')
+PASSWORD = 'bench-views-password'
+
+Route = namedtuple('Route', 'name method path data write')
+
+
+def route(name, path, method='GET', data=None, write=False):
+    return Route(name, method, path, data, write)
+
+
+def routes(reader, author, group, post, own_post, comment, followed):
+    """Все маршруты posts/urls.py и api/urls.py на данных из базы."""
+    text = {'text': 'Замер'}
+    query = '?' + urlencode({'q': 'кот'})
+    comment_kwargs = {'post_id': comment.post_id, 'pk': comment.pk}
+    found = [
+        route('posts:index', reverse('posts:index')),
+        route('posts:group_list', reverse('posts:group_list', args=[
+            group.slug
+        ])),
+        route('posts:profile', reverse('posts:profile', args=[
+            author.username
+        ])),
+        route('posts:post_detail', reverse('posts:post_detail', args=[
+            post.pk
+        ])),
+        route('posts:search', reverse('posts:search') + query),
+        route('posts:post_create', reverse('posts:post_create')),
+        route('posts:post_create', reverse('posts:post_create'), 'POST',
+              text, write=True),
+        route('posts:post_edit', reverse('posts:post_edit', args=[
+            own_post.pk
+        ])),
+        route('posts:post_edit', reverse('posts:post_edit', args=[
+            own_post.pk
+        ]), 'POST', text, write=True),
+        route('posts:add_comment', reverse('posts:add_comment', args=[
+            post.pk
+        ]), 'POST', text, write=True),
+        route('posts:follow_index', reverse('posts:follow_index')),
+        route('posts:profile_follow', reverse('posts:profile_follow', args=[
+            author.username
+        ]), write=True),
+        route('api:api-root', reverse('api:api-root')),
+        route('api:post-list', reverse('api:post-list')),
+        route('api:post-list', reverse('api:post-list'), 'POST', text,
+              write=True),
+        route('api:post-detail', reverse('api:post-detail', args=[post.pk])),
+        route('api:post-detail', reverse('api:post-detail', args=[
+            own_post.pk
+        ]), 'PATCH', text, write=True),
+        route('api:post-detail', reverse('api:post-detail', args=[
+            own_post.pk
+        ]), 'DELETE', write=True),
+        route('api:post-search', reverse('api:post-search') + query),
+        route('api:post-bulk', reverse('api:post-bulk'), 'POST',
+              [text] * 10, write=True),
+        route('api:group-list', reverse('api:group-list')),
+        route('api:group-detail', reverse('api:group-detail', args=[
+            group.pk
+        ])),
+        route('api:comment-list', reverse('api:comment-list', kwargs={
+            'post_id': post.pk
+        })),
+        route('api:comment-list', reverse('api:comment-list', kwargs={
+            'post_id': post.pk
+        }), 'POST', text, write=True),
+        route('api:comment-detail', reverse(
+            'api:comment-detail', kwargs=comment_kwargs
+        )),
+        route('api:comment-detail', reverse(
+            'api:comment-detail', kwargs=comment_kwargs
+        ), 'PATCH', text, write=True),
+        route('api:comment-detail', reverse(
+            'api:comment-detail', kwargs=comment_kwargs
+        ), 'DELETE', write=True),
+        route('api:user-list', reverse('api:user-list')),
+        route('api:user-list', reverse('api:user-list'), 'POST', {
+            'username': 'bench-views-new', 'password': PASSWORD,
+        }, write=True),
+        route('api:user-detail', reverse('api:user-detail', args=[
+            author.pk
+        ])),
+        route('api:api-token-auth', '/api/v1/api-token-auth/', 'POST', {
+            'username': reader.username, 'password': PASSWORD,
+        }),
+    ]
+    if followed is not None:
+        found.append(route(
+            'posts:profile_unfollow',
+            reverse('posts:profile_unfollow', args=[followed.username]),
+            write=True,
+        ))
+    return found
+
+
+def case_key(route, user, phase):
+    return f'{route.name} {route.method} {user} {phase}'
+
+
+def regressions(results, baseline, threshold, min_delta):
+    """Строки о том, что стало хуже базовой линии."""
+    found = []
+    for key, current in results.items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+        if current['status'] != old['status']:
+            found.append(
+                f'{key}: статус {old["status"]} → {current["status"]}'
+            )
+        for metric in ('p50', 'p95'):
+            grown = current[metric] - old[metric]
+            if (current[metric] > old[metric] * (1 + threshold)
+                    and grown > min_delta):
+                found.append(
+                    f'{key}: {metric} {old[metric]:.1f} → '
+                    f'{current[metric]:.1f} мс'
+                )
+        if current['queries'] > old['queries']:
+            found.append(
+                f'{key}: запросов {old["queries"]} → {current["queries"]}'
+            )
+        if current['alloc_kib'] > old['alloc_kib'] * (1 + threshold):
+            found.append(
+                f'{key}: память {old["alloc_kib"]:.0f} → '
+                f'{current["alloc_kib"]:.0f} КиБ'
+            )
+    return found
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет все маршруты posts и api через WSGI-обработчик в этом '
+        'процессе: холодный и тёплый кеш, аноним и вошедший пользователь. '
+        'Печатает p50/p95/p99, число запросов и выделенную память, '
+        'пишет базовую линию в JSON и сравнивает с ней. Запускать на базе, '
+        'заполненной seed_yatube; все изменения откатываются, кеш '
+        'очищается'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument(
+            '--routes', nargs='*', default=[],
+            help='Только маршруты, в имени которых есть эти подстроки',
+        )
+        parser.add_argument(
+            '--users', nargs='+', choices=USERS, default=list(USERS),
+        )
+        parser.add_argument(
+            '--phases', nargs='+', choices=PHASES, default=list(PHASES),
+        )
+        parser.add_argument('--output', help='Куда записать результаты')
+        parser.add_argument(
+            '--baseline', help='Результаты прошлого прогона для сравнения',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.25,
+            help='Допустимый относительный рост p50/p95 и памяти',
+        )
+        parser.add_argument(
+            '--min-delta', type=float, default=1.0,
+            help='Рост времени меньше стольких мс не считается регрессией',
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat должно быть больше нуля')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)['results']
+        self.handler = WSGIHandler()
+        # Ответы 401/403/404 анониму — часть замера, а не повод писать
+        # в лог на каждый повтор; ошибки 5xx по-прежнему видны
+        logger = logging.getLogger('django.request')
+        level = logger.level
+        logger.setLevel(logging.ERROR)
+        try:
+            with persistent_connection(), rolled_back():
+                results = self.run(options)
+        finally:
+            logger.setLevel(level)
+            # Данные замера откатились: ни кеш, ни просмотры не должны
+            # на них ссылаться
+            cache.clear()
+            viewcounts.take()
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump({
+                    'created': timezone.now().isoformat(),
+                    'repeat': options['repeat'],
+                    'results': results,
+                }, file, ensure_ascii=False, indent=2)
+        if baseline is not None:
+            found = regressions(
+                results, baseline, options['threshold'], options['min_delta']
+            )
+            if found:
+                raise CommandError('Регрессии:\n' + '\n'.join(found))
+            self.stdout.write(self.style.SUCCESS('Регрессий нет'))
+
+    def run(self, options):
+        self.prepare()
+        self.stdout.write(
+            f'{"маршрут":<48} {"код":>4} {"p50":>7} {"p95":>7} {"p99":>7} '
+            f'{"SQL":>4} {"КиБ":>7}'
+        )
+        results = {}
+        for item in routes(**self.fixtures):
+            if options['routes'] and not any(
+                part in item.name for part in options['routes']
+            ):
+                continue
+            for user in options['users']:
+                for phase in options['phases']:
+                    key = case_key(item, user, phase)
+                    results[key] = result = self.measure(
+                        item, user, phase, options['repeat']
+                    )
+                    self.stdout.write(
+                        f'{key:<48} {result["status"]:>4} '
+                        f'{result["p50"]:>7.1f} {result["p95"]:>7.1f} '
+                        f'{result["p99"]:>7.1f} {result["queries"]:>4} '
+                        f'{result["alloc_kib"]:>7.0f}'
+                    )
+        return results
+
+    def prepare(self):
+        stats = AuthorStats.objects.select_related('user')
+        reader = stats.filter(posts_count__gt=0).order_by(
+            '-following_count'
+        ).first()
+        if reader is None:
+            raise CommandError(
+                'В базе нет постов: сначала заполните её командой seed_yatube'
+            )
+        reader = reader.user
+        author = stats.order_by('-posts_count').first().user
+        post = author.posts.order_by('-comment_count').first()
+        followed = Follow.objects.filter(user=reader).select_related(
+            'author'
+        ).first()
+        self.fixtures = {
+            'reader': reader,
+            'author': author,
+            'group': Group.objects.order_by('-posts_count').first(),
+            'post': post,
+            'own_post': reader.posts.first(),
+            'comment': (
+                Comment.objects.filter(author=reader).first()
+                or Comment.objects.create(
+                    post=post, author=reader, text='Замер'
+                )
+            ),
+            'followed': followed and followed.author,
+        }
+        if self.fixtures['group'] is None:
+            raise CommandError('В базе нет групп')
+        reader.set_password(PASSWORD)
+        reader.save()
+        client = Client()
+        client.force_login(reader)
+        request = HttpRequest()
+        self.csrf_token = get_token(request)
+        csrf_cookie = f'csrftoken={request.META["CSRF_COOKIE"]}'
+        session = client.cookies['sessionid'].value
+        token, _ = Token.objects.get_or_create(user=reader)
+        self.headers = {
+            ('posts', 'anon'): {'HTTP_COOKIE': csrf_cookie},
+            ('posts', 'auth'): {
+                'HTTP_COOKIE': f'sessionid={session}; {csrf_cookie}',
+            },
+            ('api', 'anon'): {},
+            ('api', 'auth'): {'HTTP_AUTHORIZATION': f'Token {token.key}'},
+        }
+
+    def environ(self, item, user):
+        namespace = item.name.split(':')[0]
+        body = b''
+        content_type = ''
+        if item.data is not None and namespace == 'api':
+            body = json.dumps(item.data).encode()
+            content_type = 'application/json'
+        elif item.data is not None:
+            data = dict(item.data, csrfmiddlewaretoken=self.csrf_token)
+            body = urlencode(data).encode()
+            content_type = 'application/x-www-form-urlencoded'
+        path, _, query = item.path.partition('?')
+        return {
+            'REQUEST_METHOD': item.method,
+            'SCRIPT_NAME': '',
+            'PATH_INFO': unquote_to_bytes(path).decode('iso-8859-1'),
+            'QUERY_STRING': query,
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            # Не из INTERNAL_IPS: при DEBUG такие запросы всегда профилируются
+            'REMOTE_ADDR': '192.0.2.1',
+            'HTTP_HOST': 'localhost',
+            'CONTENT_TYPE': content_type,
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': io.StringIO(),
+            'wsgi.multithread': False,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+            **self.headers[namespace, user],
+        }
+
+    def call(self, item, user):
+        """Один запрос; возвращает (мс, код ответа, число запросов к БД)."""
+        environ = self.environ(item, user)
+        statuses = []
+
+        def start_response(status, headers, exc_info=None):
+            statuses.append(status)
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = self.handler(environ, start_response)
+            for _ in response:
+                pass
+            response.close()
+            elapsed = time.perf_counter() - started
+        return elapsed * 1e3, int(statuses[0].split()[0]), len(queries)
+
+    def call_isolated(self, item, user):
+        if not item.write:
+            return self.call(item, user)
+        # Запись откатывается, чтобы каждый повтор видел те же данные
+        with rolled_back():
+            return self.call(item, user)
+
+    def measure(self, item, user, phase, repeat):
+        if phase == 'warm':
+            self.call_isolated(item, user)
+        times = []
+        for _ in range(repeat):
+            if phase == 'cold':
+                cache.clear()
+            elapsed, status, queries = self.call_isolated(item, user)
+            times.append(elapsed)
+        # Память меряется отдельным запросом: tracemalloc замедляет код
+        if phase == 'cold':
+            cache.clear()
+        tracemalloc.start()
+        try:
+            self.call_isolated(item, user)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        times.sort()
+        return {
+            'status': status,
+            'p50': percentile(times, 0.5),
+            'p95': percentile(times, 0.95),
+            'p99': percentile(times, 0.99),
+            'queries': queries,
+            'alloc_kib': peak / 1024,
+        }
@@ -0,0 +1,357 @@
+"""
+Метрики в формате Prometheus, общие для всех WSGI-воркеров хоста.
+
+MetricsMiddleware (core/middleware.py) после каждого ответа отмечает
+в памяти процесса число ответов и их время по имени URL (posts:index,
+api:post-list, ...), число и время запросов к БД, попадания и промахи
+кеша (по счётчикам core/profiling.py), а также размер загрузок. После ответа,
+если с прошлой записи прошло METRICS_FLUSH_INTERVAL секунд, и при
+остановке процесса приращения дописываются одним UPSERT в файл SQLite
+METRICS_PATH. Страница /metrics/ складывает в нём данные всех процессов;
+процесс, который её отдаёт, сначала записывает свои приращения.
+
+Значения в файле переживают перезапуск воркеров; чтобы обнулить
+счётчики, достаточно удалить файл.
+"""
+import atexit
+import bisect
+import collections
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.dispatch import receiver
+
+from .sqlite import Immediate, connect
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS samples ('
+    ' name TEXT NOT NULL,'
+    ' labels TEXT NOT NULL,'
+    ' value REAL NOT NULL,'
+    ' PRIMARY KEY (name, labels)'
+    ')',
+)
+
+UPSERT = (
+    'INSERT INTO samples (name, labels, value) VALUES (?, ?, ?) '
+    'ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value'
+)
+
+# Прочие методы попадают в метку method="other": иначе любой клиент
+# может завести сколько угодно рядов
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+# Метка view для запросов, не дошедших до представления (404 по URL)
+UNMATCHED = 'unmatched'
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+UPLOAD_BUCKETS = tuple(2 ** power for power in range(10, 25, 2))
+
+INF = float('inf')
+
+REGISTRY = []
+
+_lock = threading.Lock()
+_pending = collections.Counter()
+_last_flush = time.monotonic()
+_local = threading.local()
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('\n', r'\n')
+        .replace('"', r'\"')
+    )
+
+
+def _number(value):
+    if value == INF:
+        return '+Inf'
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _join(*parts):
+    return ','.join(part for part in parts if part)
+
+
+def _sample(name, labels, value):
+    if labels:
+        name = f'{name}{{{labels}}}'
+    return f'{name} {_number(value)}'
+
+
+def _add(name, labels, amount):
+    with _lock:
+        _pending[name, labels] += amount
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Значения меток повторяются (имена URL, методы, коды ответа):
+        # строка меток собирается один раз
+        self._labels = {}
+        REGISTRY.append(self)
+
+    def labels(self, values):
+        labels = self._labels.get(values)
+        if labels is None:
+            labels = self._labels[values] = ','.join(
+                f'{name}="{_escape(value)}"'
+                for name, value in zip(self.labelnames, values)
+            )
+        return labels
+
+    def render(self, rows):
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+        lines.extend(self.samples(rows))
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        _add(self.name, self.labels(labels), amount)
+
+    def samples(self, rows):
+        values = rows.get(self.name, {})
+        return [
+            _sample(self.name, labels, values[labels])
+            for labels in sorted(values)
+        ]
+
+
+class Histogram(Metric):
+    """Гистограмма; в файле лежат некумулятивные корзины."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames, buckets):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self._buckets = {}
+
+    def _bucket(self, labels, bound):
+        return _join(labels, f'le="{_number(bound)}"')
+
+    def observe(self, labels, value):
+        labels = self.labels(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            if index < len(self.buckets):
+                key = self._buckets.get((labels, index))
+                if key is None:
+                    key = self._buckets[labels, index] = self._bucket(
+                        labels, self.buckets[index]
+                    )
+                _pending[f'{self.name}_bucket', key] += 1
+            _pending[f'{self.name}_sum', labels] += value
+            _pending[f'{self.name}_count', labels] += 1
+
+    def samples(self, rows):
+        buckets = rows.get(f'{self.name}_bucket', {})
+        sums = rows.get(f'{self.name}_sum', {})
+        counts = rows.get(f'{self.name}_count', {})
+        lines = []
+        for labels in sorted(counts):
+            cumulative = 0
+            for bound in self.buckets:
+                key = self._bucket(labels, bound)
+                cumulative += buckets.get(key, 0)
+                lines.append(_sample(f'{self.name}_bucket', key, cumulative))
+            # В +Inf попадают все наблюдения, и вошедшие в корзины, и нет
+            lines.append(_sample(
+                f'{self.name}_bucket', self._bucket(labels, INF),
+                counts[labels],
+            ))
+            lines.append(
+                _sample(f'{self.name}_sum', labels, sums.get(labels, 0))
+            )
+            lines.append(
+                _sample(f'{self.name}_count', labels, counts[labels])
+            )
+        return lines
+
+
+class Ratio(Metric):
+    """Доля попаданий hits / (hits + misses), считается при выдаче."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, hits, misses):
+        super().__init__(name, documentation, hits.labelnames)
+        self.hits = hits
+        self.misses = misses
+
+    def samples(self, rows):
+        hits = rows.get(self.hits.name, {})
+        misses = rows.get(self.misses.name, {})
+        lines = []
+        for labels in sorted(set(hits) | set(misses)):
+            total = hits.get(labels, 0) + misses.get(labels, 0)
+            if total:
+                lines.append(
+                    _sample(self.name, labels, hits.get(labels, 0) / total)
+                )
+        return lines
+
+
+REQUESTS = Counter(
+    'yatube_requests_total', 'Ответы по имени URL, методу и коду ответа',
+    ('view', 'method', 'status'),
+)
+LATENCY = Histogram(
+    'yatube_request_duration_seconds', 'Время ответа по имени URL',
+    ('view',), DURATION_BUCKETS,
+)
+QUERIES = Histogram(
+    'yatube_db_queries', 'Запросов к БД на один ответ',
+    ('view',), QUERY_BUCKETS,
+)
+DB_TIME = Histogram(
+    'yatube_db_duration_seconds', 'Время запросов к БД на один ответ',
+    ('view',), DURATION_BUCKETS,
+)
+CACHE_HITS = Counter(
+    'yatube_cache_hits_total', 'Попадания в кеш по имени URL', ('view',),
+)
+CACHE_MISSES = Counter(
+    'yatube_cache_misses_total', 'Промахи кеша по имени URL', ('view',),
+)
+CACHE_HIT_RATIO = Ratio(
+    'yatube_cache_hit_ratio', 'Доля попаданий в кеш по имени URL',
+    CACHE_HITS, CACHE_MISSES,
+)
+UPLOADS = Histogram(
+    'yatube_upload_bytes', 'Размер тела multipart-запросов (загрузок)',
+    ('view',), UPLOAD_BUCKETS,
+)
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else UNMATCHED
+
+
+def upload_size(request):
+    """Размер тела multipart-запроса в байтах или None."""
+    if request.content_type != 'multipart/form-data':
+        return None
+    try:
+        return int(request.META.get('CONTENT_LENGTH') or 0) or None
+    except ValueError:
+        return None
+
+
+def observe_request(request, response, counters, elapsed):
+    """Отмечает ответ: время, запросы к БД, кеш и размер загрузки."""
+    view = view_name(request)
+    method = request.method if request.method in METHODS else 'other'
+    REQUESTS.inc((view, method, response.status_code))
+    LATENCY.observe((view,), elapsed)
+    QUERIES.observe((view,), counters.queries)
+    DB_TIME.observe((view,), counters.db_time)
+    if counters.cache_hits:
+        CACHE_HITS.inc((view,), counters.cache_hits)
+    if counters.cache_misses:
+        CACHE_MISSES.inc((view,), counters.cache_misses)
+    size = upload_size(request)
+    if size is not None:
+        UPLOADS.observe((view,), size)
+
+
+def _connection():
+    path = settings.METRICS_PATH
+    key = (os.getpid(), path)
+    # После fork соединение родителя использовать нельзя
+    if getattr(_local, 'key', None) != key:
+        _local.conn = connect(path, 5, SCHEMA)
+        _local.key = key
+    return _local.conn
+
+
+def take():
+    """Забирает приращения этого процесса {(имя, метки): значение}."""
+    global _pending, _last_flush
+    with _lock:
+        taken, _pending = _pending, collections.Counter()
+        _last_flush = time.monotonic()
+    return taken
+
+
+def flush():
+    """Дописывает приращения процесса в общий файл; возвращает их число."""
+    deltas = take()
+    if not deltas:
+        return 0
+    try:
+        conn = _connection()
+        with Immediate(conn):
+            conn.executemany(
+                UPSERT,
+                [(name, labels, value)
+                 for (name, labels), value in deltas.items()],
+            )
+    except (sqlite3.Error, OSError):
+        # Вернём приращения и попробуем при следующей записи
+        logger.exception('Не удалось записать метрики')
+        with _lock:
+            _pending.update(deltas)
+        return 0
+    return len(deltas)
+
+
+def should_flush():
+    return bool(_pending) and (
+        time.monotonic() - _last_flush >= settings.METRICS_FLUSH_INTERVAL
+    )
+
+
+@receiver(request_finished)
+def flush_after_request(sender, **kwargs):
+    # Ответ уже отдан: запись не задерживает посетителя
+    if should_flush():
+        flush()
+
+
+atexit.register(flush)
+
+
+def collect():
+    """Сумма по всем процессам: {имя ряда: {метки: значение}}."""
+    flush()
+    rows = collections.defaultdict(dict)
+    for name, labels, value in _connection().execute(
+        'SELECT name, labels, value FROM samples'
+    ):
+        rows[name][labels] = value
+    return rows
+
+
+def exposition():
+    """Все метрики в текстовом формате Prometheus."""
+    rows = collect()
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render(rows))
+    return '\n'.join(lines) + '\n'
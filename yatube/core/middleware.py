@@ -0,0 +1,97 @@
+"""
+Профилирование запросов в бою (замена debug_toolbar).
+
+Для доли запросов PROFILING_SAMPLE_RATE (а при DEBUG — для всех запросов
+с INTERNAL_IPS) middleware собирает профиль core/profiling.py и отдаёт
+его в заголовке Server-Timing и одной строкой JSON в лог core.profiling.
+Остальные запросы профиль не пишут.
+
+MetricsMiddleware с каждого запроса снимает только счётчики
+(profiling.counting): число и время запросов к БД, попадания и промахи
+кеша — и копит из них метрики Prometheus (core/metrics.py).
+"""
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
+
+from . import metrics, profiling
+
+logger = logging.getLogger('core.profiling')
+
+
+def should_profile(request):
+    if settings.DEBUG and (
+        request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS
+    ):
+        return True
+    rate = settings.PROFILING_SAMPLE_RATE
+    return rate > 0 and random.random() < rate
+
+
+def _ms(seconds):
+    return round(seconds * 1e3, 2)
+
+
+def server_timing(profile, total):
+    return ', '.join((
+        f'db;dur={_ms(profile.db_time)};desc="{profile.queries} queries"',
+        f'tpl;dur={_ms(profile.template_time)}',
+        f'cache;dur={_ms(profile.cache_time)};'
+        f'desc="{profile.cache_hits} hits, {profile.cache_misses} misses"',
+        f'total;dur={_ms(total)}',
+    ))
+
+
+def log_record(request, response, profile, total):
+    match = getattr(request, 'resolver_match', None)
+    return {
+        'method': request.method,
+        'path': request.path,
+        'view': match.view_name if match else None,
+        'status': response.status_code,
+        'total_ms': _ms(total),
+        'db_ms': _ms(profile.db_time),
+        'queries': profile.queries,
+        'template_ms': _ms(profile.template_time),
+        'cache_ms': _ms(profile.cache_time),
+        'cache_hits': profile.cache_hits,
+        'cache_misses': profile.cache_misses,
+    }
+
+
+class RequestProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        profiling.install()
+
+    def __call__(self, request):
+        if not should_profile(request):
+            return self.get_response(request)
+        started = time.perf_counter()
+        with profiling.profiling() as profile:
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+        response['Server-Timing'] = server_timing(profile, total)
+        record = log_record(request, response, profile, total)
+        logger.info(
+            json.dumps(record, ensure_ascii=False), extra={'profile': record}
+        )
+        return response
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        profiling.install_cache()
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with profiling.counting() as counters:
+            response = self.get_response(request)
+        metrics.observe_request(
+            request, response, counters, time.perf_counter() - started
+        )
+        return response
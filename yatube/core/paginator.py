@@ -0,0 +1,227 @@
+"""
+Постраничный вывод по ключу (keyset pagination).
+
+Вместо OFFSET/LIMIT и COUNT(*) страница выбирается условием
+«строго после (или до) последней показанной записи» по набору полей
+сортировки, например (pub_date, id). Такой запрос читает ровно одну
+страницу по индексу, сколько бы записей ни было перед ней.
+"""
+import base64
+import json
+from collections.abc import Sequence
+
+from django.db.models import Q
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class KeysetPage(Sequence):
+    """Страница, совместимая по интерфейсу с django.core.paginator.Page."""
+
+    # У страницы по ключу нет номера и общего числа страниц
+    number = None
+    paginator = None
+
+    def __init__(self, object_list, cursor='', next_cursor='',
+                 previous_cursor=''):
+        self.object_list = object_list
+        self.cursor = cursor or ''
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<KeysetPage {self.cursor or "first"}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return bool(self.next_cursor)
+
+    def has_previous(self):
+        return bool(self.previous_cursor)
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def key(self):
+        """Ключ страницы для кеша разметки."""
+        return self.cursor
+
+
+class LazyKeysetPage(KeysetPage):
+    """
+    KeysetPage, которая выбирает строки при первом обращении к ним.
+
+    Ключ key известен без запроса к БД, поэтому шаблон может искать
+    готовую разметку страницы в кеше и вовсе не читать строки.
+    """
+
+    def __init__(self, paginator, cursor):
+        self._paginator = paginator
+        self._cursor = cursor
+        self._page = None
+
+    def __repr__(self):
+        return f'<LazyKeysetPage {self.key or "first"}>'
+
+    def __getitem__(self, index):
+        # Шаблон ищет page_obj.number сначала как page_obj['number']:
+        # такой поиск не должен читать строки
+        if not isinstance(index, (int, slice)):
+            raise TypeError(index)
+        return super().__getitem__(index)
+
+    def _load(self):
+        if self._page is None:
+            self._page = self._paginator.get_page(self._cursor)
+        return self._page
+
+    @property
+    def key(self):
+        # Кривой ключ — та же первая страница, что и без ключа
+        if self._paginator.decode(self._cursor) is None:
+            return ''
+        return self._cursor
+
+    @property
+    def object_list(self):
+        return self._load().object_list
+
+    @object_list.setter
+    def object_list(self, value):
+        self._load().object_list = value
+
+    @property
+    def cursor(self):
+        return self._load().cursor
+
+    @property
+    def next_cursor(self):
+        return self._load().next_cursor
+
+    @property
+    def previous_cursor(self):
+        return self._load().previous_cursor
+
+
+class KeysetPaginator:
+    """
+    Разбивает queryset на страницы по ключу из полей ordering.
+
+    Все поля ordering должны сортироваться в одну сторону, а последнее
+    из них — быть уникальным (обычно pk), иначе порядок неоднозначен.
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-pk')):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.descending = self.ordering[0].startswith('-')
+
+    def _model_field(self, name):
+        opts = self.object_list.model._meta
+        return opts.pk if name == 'pk' else opts.get_field(name)
+
+    def encode(self, obj, direction):
+        values = [
+            self._model_field(name).value_to_string(obj)
+            for name in self.fields
+        ]
+        raw = json.dumps([direction] + values, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode(self, cursor):
+        """Возвращает (направление, значения) или None для кривого ключа."""
+        if not cursor:
+            return None
+        try:
+            padding = '=' * (-len(cursor) % 4)
+            raw = base64.urlsafe_b64decode(cursor + padding)
+            direction, *values = json.loads(raw.decode())
+            if direction not in (NEXT, PREVIOUS):
+                return None
+            if len(values) != len(self.fields):
+                return None
+            values = [
+                self._model_field(name).to_python(value)
+                for name, value in zip(self.fields, values)
+            ]
+        except Exception:
+            return None
+        return direction, values
+
+    def _after(self, values, forward):
+        """Условие «строго после ключа» в порядке ordering (или до него)."""
+        lookup = 'lt' if self.descending == forward else 'gt'
+        condition = Q()
+        for index, name in enumerate(self.fields):
+            step = Q(**{f'{name}__{lookup}': values[index]})
+            for prev_name, prev_value in zip(self.fields, values[:index]):
+                step &= Q(**{prev_name: prev_value})
+            condition |= step
+        if len(self.fields) > 1:
+            # Избыточный диапазон по первому полю: без него SQLite на
+            # больших таблицах разбирает OR по отдельным индексам и
+            # сортирует результат вместо чтения одного диапазона индекса
+            first = Q(**{f'{self.fields[0]}__{lookup}e': values[0]})
+            condition = first & condition
+        return condition
+
+    def _reversed_ordering(self):
+        return tuple(
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        )
+
+    def page_queryset(self, values=None):
+        """Запрос страницы «вперёд» после ключа values (None — первая)."""
+        queryset = self.object_list
+        if values is not None:
+            queryset = queryset.filter(self._after(values, forward=True))
+        return queryset.order_by(*self.ordering)[:self.per_page + 1]
+
+    def get_lazy_page(self, cursor=None):
+        """Как get_page, но строки читаются при первом обращении."""
+        return LazyKeysetPage(self, cursor)
+
+    def get_page(self, cursor=None):
+        decoded = self.decode(cursor)
+        limit = self.per_page + 1
+        if decoded is not None and decoded[0] == PREVIOUS:
+            rows = list(
+                self.object_list
+                .filter(self._after(decoded[1], forward=False))
+                .order_by(*self._reversed_ordering())[:limit]
+            )
+            if rows:
+                has_previous = len(rows) > self.per_page
+                rows = rows[:self.per_page][::-1]
+                return KeysetPage(
+                    rows,
+                    cursor=cursor,
+                    next_cursor=self.encode(rows[-1], NEXT),
+                    previous_cursor=(
+                        self.encode(rows[0], PREVIOUS) if has_previous else ''
+                    ),
+                )
+            # Перед ключом ничего нет — показываем первую страницу
+            decoded = None
+        rows = list(self.page_queryset(decoded[1] if decoded else None))
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return KeysetPage(
+            rows,
+            cursor=cursor if decoded is not None else '',
+            next_cursor=self.encode(rows[-1], NEXT) if has_next else '',
+            previous_cursor=(
+                self.encode(rows[0], PREVIOUS)
+                if decoded is not None and rows else ''
+            ),
+        )
@@ -0,0 +1,189 @@
+"""
+Профиль запроса: запросы к БД, рендеринг шаблонов и обращения к кешу.
+
+Счётчики запроса (Counters) — число и время запросов к БД, попадания
+и промахи кеша. Их с каждого запроса снимает counting() для метрик:
+это по прибавлению на запрос к БД и на обращение к кешу. Полный профиль
+(Profile) снимает profiling() с запросов из выборки: к счётчикам он
+добавляет время шаблонов и кеша.
+
+Запросы к БД считаются через connection.execute_wrapper, а шаблоны
+и кеш — через обёртки Template.render и методов get/get_many бэкендов
+кеша, которые ставятся один раз на процесс (install, install_cache).
+Вне counting() и profiling() обёртки сразу зовут исходный метод, так что
+их цена — одна проверка.
+"""
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.base import Template
+
+_local = threading.local()
+_installed = False
+_installed_cache = False
+_missing = object()
+
+
+class Counters:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+    def cache_call(self, hits, misses, elapsed):
+        self.cache_hits += hits
+        self.cache_misses += misses
+
+
+class Profile(Counters):
+    def __init__(self):
+        super().__init__()
+        self.template_time = 0.0
+        self.cache_time = 0.0
+        # Вложенные шаблоны (include) не считаются второй раз
+        self.rendering = False
+
+    def cache_call(self, hits, misses, elapsed):
+        super().cache_call(hits, misses, elapsed)
+        self.cache_time += elapsed
+
+
+def _recorders():
+    return getattr(_local, 'recorders', ())
+
+
+def current():
+    """Профиль текущего запроса или None."""
+    for recorder in reversed(_recorders()):
+        if isinstance(recorder, Profile):
+            return recorder
+    return None
+
+
+@contextmanager
+def _recording(recorder):
+    outer = _recorders()
+    _local.recorders = outer + (recorder,)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            yield recorder
+    finally:
+        _local.recorders = outer
+
+
+@contextmanager
+def counting():
+    """Считает запросы к БД и кеш внутри блока; отдаёт объект Counters."""
+    install_cache()
+    with _recording(Counters()) as counters:
+        yield counters
+
+
+@contextmanager
+def profiling():
+    """
+    Собирает профиль кода внутри блока; отдаёт объект Profile.
+
+    Внутри уже профилируемого блока отдаёт внешний профиль: один запрос
+    считается одним профилем, сколько бы middleware его ни читало.
+    """
+    install()
+    outer = current()
+    if outer is not None:
+        yield outer
+        return
+    with _recording(Profile()) as profile:
+        yield profile
+
+
+def _profiled_render(render):
+    def wrapper(self, context):
+        profile = current()
+        if profile is None or profile.rendering:
+            return render(self, context)
+        profile.rendering = True
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            profile.template_time += time.perf_counter() - started
+            profile.rendering = False
+    return wrapper
+
+
+def _counting(recorders):
+    # Вложенные вызовы кеша (get_many через get) не считаются второй раз
+    return recorders and not getattr(_local, 'in_cache', False)
+
+
+def _cache_call(method, *args):
+    """Вызов метода кеша и его время; обёртки зовут его на каждый get."""
+    _local.in_cache = True
+    started = time.perf_counter()
+    try:
+        return method(*args), time.perf_counter() - started
+    finally:
+        _local.in_cache = False
+
+
+def _profiled_get(get):
+    def wrapper(self, key, default=None, version=None):
+        recorders = _recorders()
+        if not _counting(recorders):
+            return get(self, key, default, version)
+        value, elapsed = _cache_call(get, self, key, _missing, version)
+        hit = value is not _missing
+        for recorder in recorders:
+            recorder.cache_call(hit, not hit, elapsed)
+        return value if hit else default
+    return wrapper
+
+
+def _profiled_get_many(get_many):
+    def wrapper(self, keys, version=None):
+        recorders = _recorders()
+        if not _counting(recorders):
+            return get_many(self, keys, version)
+        keys = list(keys)
+        found, elapsed = _cache_call(get_many, self, keys, version)
+        for recorder in recorders:
+            recorder.cache_call(len(found), len(keys) - len(found), elapsed)
+        return found
+    return wrapper
+
+
+def install_cache():
+    """Ставит обёртки кеша; повторные вызовы ничего не делают."""
+    global _installed_cache
+    if _installed_cache:
+        return
+    classes = {type(caches[alias]) for alias in settings.CACHES}
+    for cache_class in classes:
+        cache_class.get = _profiled_get(cache_class.get)
+        cache_class.get_many = _profiled_get_many(cache_class.get_many)
+    _installed_cache = True
+
+
+def install():
+    """Ставит обёртки шаблонов и кеша; повторные вызовы ничего не делают."""
+    global _installed
+    install_cache()
+    if _installed:
+        return
+    Template.render = _profiled_render(Template.render)
+    _installed = True
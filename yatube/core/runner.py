@@ -0,0 +1,41 @@
+"""
+Тестовый прогон с кешем в памяти и файлом метрик во временном каталоге.
+
+Общий кеш (YATUBE_CACHE=shared, по умолчанию) и файл метрик лежат рядом
+с рабочей базой: тесты не должны ни читать оттуда чужие фрагменты, ни
+дописывать туда свои приращения — MetricsMiddleware отмечает каждый
+запрос тестового клиента. По той же причине в конце прогона
+отбрасываются накопленные тестами просмотры постов (posts/viewcounts.py):
+тестовой базы, для которой они накоплены, уже нет.
+"""
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.metrics_directory = tempfile.mkdtemp()
+        self.test_settings = override_settings(
+            CACHES={'default': settings.CACHE_BACKENDS['locmem']},
+            METRICS_PATH=os.path.join(
+                self.metrics_directory, 'metrics.sqlite3'
+            ),
+        )
+        self.test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        from posts import viewcounts
+        from . import metrics
+
+        # Иначе atexit попробует дописать их в рабочие файл и базу
+        metrics.take()
+        viewcounts.take()
+        self.test_settings.disable()
+        shutil.rmtree(self.metrics_directory, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,116 @@
+"""
+Заполнение кеша в один поток (single flight).
+
+Когда горячая запись истекает, все запросы, пришедшие за ней
+одновременно, промахиваются и строят одно и то же значение. Здесь
+значение строит только тот, кто первым взял блокировку (cache.add
+атомарен и между процессами); остальные на это время получают
+устаревшее значение, а если его нет — ждут в течение WAIT секунд,
+пока значение не появится в кеше.
+
+Значение хранится вместе со сроком свежести и живёт в кеше ещё
+столько же после него: устаревшую копию можно отдать, пока строится
+новая.
+"""
+import time
+from functools import wraps
+
+from django.core.cache import cache as default_cache
+
+# Сколько держится блокировка, если строивший значение процесс упал
+LOCK_TIMEOUT = 30
+# Сколько ждать чужого заполнения, прежде чем строить самим
+WAIT = 2.0
+POLL_INTERVAL = 0.02
+
+
+class DontCache(Exception):
+    """fill() может вернуть value, не сохраняя его: raise DontCache(value)."""
+
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+
+def _lock_key(key):
+    return f'{key}:filling'
+
+
+def _store(cache, key, value, timeout):
+    if timeout is None:
+        cache.set(key, (value, None), None)
+    else:
+        fresh_until = time.time() + timeout
+        cache.set(key, (value, fresh_until), timeout * 2)
+
+
+def _fill(cache, key, fill, timeout):
+    try:
+        value = fill()
+        _store(cache, key, value, timeout)
+    except DontCache as result:
+        value = result.value
+    finally:
+        cache.delete(_lock_key(key))
+    return value
+
+
+def get_or_fill(key, fill, timeout, cache=None):
+    """
+    Значение key из кеша; на промахе его строит fill() ровно в одном
+    запросе из одновременных. timeout — срок свежести в секундах
+    (None — бессрочно, 0 — без кеша).
+    """
+    if timeout == 0:
+        try:
+            return fill()
+        except DontCache as result:
+            return result.value
+    cache = cache or default_cache
+    entry = cache.get(key)
+    if entry is not None:
+        value, fresh_until = entry
+        if fresh_until is None or fresh_until > time.time():
+            return value
+        if cache.add(_lock_key(key), 1, LOCK_TIMEOUT):
+            return _fill(cache, key, fill, timeout)
+        # Значение уже строит другой запрос
+        return value
+    if cache.add(_lock_key(key), 1, LOCK_TIMEOUT):
+        return _fill(cache, key, fill, timeout)
+    deadline = time.monotonic() + WAIT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    # Не дождались: строим сами, чтобы не держать запрос дольше
+    try:
+        value = fill()
+    except DontCache as result:
+        return result.value
+    _store(cache, key, value, timeout)
+    return value
+
+
+def single_flight(key, timeout):
+    """
+    Декоратор: результат функции (или представления) кешируется через
+    get_or_fill. key(*args, **kwargs) возвращает ключ кеша или None,
+    если результат кешировать не нужно.
+
+        @single_flight(lambda request: f'page:{request.path}', 60)
+        def index(request):
+            ...
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_key = key(*args, **kwargs)
+            if cache_key is None:
+                return func(*args, **kwargs)
+            return get_or_fill(
+                cache_key, lambda: func(*args, **kwargs), timeout
+            )
+        return wrapper
+    return decorator
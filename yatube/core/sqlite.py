@@ -0,0 +1,38 @@
+"""
+Общие для файлов SQLite вне Django ORM (кеш core/cache.py, метрики
+core/metrics.py) соединение в режиме WAL и транзакция на запись.
+"""
+import os
+import sqlite3
+
+
+def connect(path, timeout, schema=()):
+    """
+    Соединение в режиме автокоммита с журналом WAL; создаёт каталог
+    файла и выполняет выражения schema.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(
+        path, timeout=timeout, isolation_level=None, check_same_thread=False,
+    )
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    for statement in schema:
+        conn.execute(statement)
+    return conn
+
+
+class Immediate:
+    """BEGIN IMMEDIATE ... COMMIT: берём блокировку записи сразу."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
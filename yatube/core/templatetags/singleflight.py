@@ -0,0 +1,59 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from core.singleflight import get_or_fill
+
+register = template.Library()
+
+
+class SingleFlightNode(template.Node):
+    def __init__(self, nodelist, expire_time_var, fragment_name, vary_on):
+        self.nodelist = nodelist
+        self.expire_time_var = expire_time_var
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        expire_time = self.expire_time_var.resolve(context)
+        if expire_time is not None:
+            try:
+                expire_time = int(expire_time)
+            except (ValueError, TypeError):
+                raise template.TemplateSyntaxError(
+                    '"singleflight" tag got a non-integer timeout value: %r'
+                    % expire_time
+                )
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        # Свой префикс: формат записи отличается от тега cache
+        key = 'singleflight.' + make_template_fragment_key(
+            self.fragment_name, vary_on
+        )
+        return get_or_fill(
+            key, lambda: self.nodelist.render(context), expire_time
+        )
+
+
+@register.tag('singleflight')
+def do_singleflight(parser, token):
+    """
+    Как {% cache %}, но фрагмент после истечения строит только один
+    из одновременных запросов:
+
+        {% load singleflight %}
+        {% singleflight 500 sidebar request.user.username %}
+            .. sidebar ..
+        {% endsingleflight %}
+    """
+    nodelist = parser.parse(('endsingleflight',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            "'%r' tag requires at least 2 arguments." % tokens[0]
+        )
+    return SingleFlightNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]],
+    )
@@ -0,0 +1,73 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Post
+from ..management.commands.bench_views import regressions
+
+
+class BenchViewsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'seed_yatube', users=10, groups=2, posts=30, comments=30,
+            follows=3, seed=1, timelines=True, stdout=StringIO(),
+        )
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'baseline.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def bench(self, *routes, **options):
+        call_command(
+            'bench_views', repeat=2, routes=list(routes), stdout=StringIO(),
+            **options
+        )
+
+    def test_baseline_written(self):
+        """Результаты по маршрутам, пользователям и фазам пишутся в JSON."""
+        self.bench('posts:index', 'api:post-list', output=self.path)
+        with open(self.path, encoding='utf-8') as file:
+            results = json.load(file)['results']
+        self.assertEqual(results['posts:index GET anon warm']['status'], 200)
+        self.assertEqual(results['api:post-list GET anon cold']['status'], 401)
+        self.assertEqual(results['api:post-list GET auth cold']['status'], 200)
+        self.assertEqual(
+            set(results['posts:index GET auth cold']),
+            {'status', 'p50', 'p95', 'p99', 'queries', 'alloc_kib'},
+        )
+
+    def test_writes_rolled_back(self):
+        """Запросы на запись не оставляют данных в базе."""
+        count = Post.objects.count()
+        self.bench('posts:post_create', 'api:post-bulk')
+        self.assertEqual(Post.objects.count(), count)
+
+    def test_regressions(self):
+        """Рост времени, запросов и смена статуса — регрессии."""
+        old = {
+            'status': 200, 'p50': 10.0, 'p95': 20.0, 'p99': 30.0,
+            'queries': 3, 'alloc_kib': 100.0,
+        }
+        same = dict(old, p50=10.5)
+        slower = dict(old, p95=40.0)
+        more_queries = dict(old, queries=4)
+        failing = dict(old, status=500)
+        tiny = {**old, 'p50': 0.2, 'p95': 0.4}
+        tiny_slower = {**tiny, 'p50': 0.5, 'p95': 0.9}
+        self.assertEqual(regressions({'a': same}, {'a': old}, 0.25, 1.0), [])
+        self.assertEqual(
+            regressions({'a': tiny_slower}, {'a': tiny}, 0.25, 1.0), []
+        )
+        for current in (slower, more_queries, failing):
+            self.assertEqual(
+                len(regressions({'a': current}, {'a': old}, 0.25, 1.0)), 1
+            )
@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from ..cache import SQLiteCache
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.path, {'OPTIONS': options})
+
+    def test_set_get_delete(self):
+        """Значения сохраняются, читаются и удаляются."""
+        self.cache.set('key', {'answer': 42})
+        self.assertEqual(self.cache.get('key'), {'answer': 42})
+        self.assertTrue(self.cache.delete('key'))
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_expired_values_are_missing(self):
+        """Просроченная запись не возвращается и не мешает add."""
+        self.cache.set('key', 'value', timeout=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+        self.assertFalse(self.cache.add('key', 'newer'))
+        self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_incr_is_shared_between_instances(self):
+        """Два экземпляра на одном файле видят общие значения."""
+        other = self.make_cache()
+        self.cache.set('version', 1)
+        other.incr('version')
+        self.assertEqual(self.cache.incr('version'), 3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_get_many(self):
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c']), {'a': 1, 'b': 2}
+        )
+
+    def test_lru_eviction_by_entries(self):
+        """При переполнении вытесняются давно не читанные записи."""
+        cache = self.make_cache(MAX_ENTRIES=3, CULL_FREQUENCY=3)
+        cache.ACCESS_GRANULARITY = 0
+        for key in ('a', 'b', 'c', 'd'):
+            cache.set(key, key)
+            time.sleep(0.001)
+        cache.get('a')
+        cache.cull()
+        self.assertEqual(cache.get('a'), 'a')
+        self.assertIsNone(cache.get('b'))
+
+    def test_eviction_by_size(self):
+        """Суммарный объём записей не превышает MAX_SIZE."""
+        cache = self.make_cache(MAX_SIZE=10000)
+        for i in range(10):
+            cache.set(f'key{i}', 'x' * 2000)
+            time.sleep(0.001)
+        cache.cull()
+        self.assertIsNone(cache.get('key0'))
+        self.assertIsNotNone(cache.get('key9'))
@@ -0,0 +1,159 @@
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from .. import metrics
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        overridden = override_settings(
+            METRICS_PATH=os.path.join(self.directory, 'metrics.sqlite3'),
+            METRICS_ALLOWED_IPS=['127.0.0.1'],
+        )
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+        # Приращения прошлых тестов в этот файл не попадают
+        metrics.take()
+
+    def tearDown(self):
+        metrics.take()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def scrape(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        return response.content.decode().splitlines()
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_request_metrics(self):
+        """
+        Ответы считаются по имени URL вместе с запросами к БД и кешем —
+        и без профилирования.
+        """
+        self.client.get(reverse('posts:index'))
+        self.client.get('/no-such-page/')
+        lines = self.scrape()
+        for line in (
+            'yatube_requests_total{view="posts:index",method="GET",'
+            'status="200"} 1',
+            'yatube_requests_total{view="unmatched",method="GET",'
+            'status="404"} 1',
+            'yatube_request_duration_seconds_count{view="posts:index"} 1',
+            'yatube_db_queries_bucket{view="posts:index",le="+Inf"} 1',
+            'yatube_db_duration_seconds_count{view="posts:index"} 1',
+            '# TYPE yatube_request_duration_seconds histogram',
+        ):
+            self.assertIn(line, lines)
+        self.assertTrue(any(
+            line.startswith('yatube_cache_hit_ratio{view="posts:index"}')
+            for line in lines
+        ))
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0)
+    def test_profiled_request_counted_once(self):
+        """Метрики ответа из выборки совпадают с его профилем."""
+        with self.assertLogs('core.profiling', 'INFO') as logs:
+            self.client.get(reverse('posts:index'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        with self.assertLogs('core.profiling', 'INFO'):
+            lines = self.scrape()
+        for line in (
+            f'yatube_db_queries_sum{{view="posts:index"}} '
+            f'{record["queries"]}',
+            f'yatube_cache_misses_total{{view="posts:index"}} '
+            f'{record["cache_misses"]}',
+        ):
+            self.assertIn(line, lines)
+
+    def test_histogram_buckets_cumulative(self):
+        """Корзины в выдаче накопительные, +Inf равна числу наблюдений."""
+        for value in (0.003, 0.3, 20):
+            metrics.LATENCY.observe(('v',), value)
+        lines = self.scrape()
+        name = 'yatube_request_duration_seconds'
+        for line in (
+            f'{name}_bucket{{view="v",le="0.005"}} 1',
+            f'{name}_bucket{{view="v",le="0.25"}} 1',
+            f'{name}_bucket{{view="v",le="0.5"}} 2',
+            f'{name}_bucket{{view="v",le="10"}} 2',
+            f'{name}_bucket{{view="v",le="+Inf"}} 3',
+            f'{name}_sum{{view="v"}} 20.303',
+            f'{name}_count{{view="v"}} 3',
+        ):
+            self.assertIn(line, lines)
+
+    def test_cache_hit_ratio(self):
+        metrics.CACHE_HITS.inc(('v',), 3)
+        metrics.CACHE_MISSES.inc(('v',))
+        self.assertIn('yatube_cache_hit_ratio{view="v"} 0.75', self.scrape())
+
+    def test_upload_size(self):
+        """Размер multipart-запроса попадает в гистограмму загрузок."""
+        image = SimpleUploadedFile('a.gif', b'x' * 5000, 'image/gif')
+        self.client.post(
+            reverse('posts:post_create'), {'text': 'Текст', 'image': image}
+        )
+        self.assertIn(
+            'yatube_upload_bytes_bucket{view="posts:post_create",'
+            'le="4096"} 0',
+            self.scrape(),
+        )
+        self.assertIn(
+            'yatube_upload_bytes_count{view="posts:post_create"} 1',
+            self.scrape(),
+        )
+
+    def test_aggregated_across_processes(self):
+        """Приращения разных процессов складываются в общем файле."""
+        metrics.REQUESTS.inc(('v', 'GET', 200))
+        child = multiprocessing.get_context('fork').Process(
+            target=_record_in_child
+        )
+        child.start()
+        child.join()
+        self.assertEqual(child.exitcode, 0)
+        self.assertIn(
+            'yatube_requests_total{view="v",method="GET",status="200"} 3',
+            self.scrape(),
+        )
+
+    def test_allowed_ips(self):
+        for allowed in (['192.0.2.1'], []):
+            with self.subTest(allowed=allowed):
+                with override_settings(METRICS_ALLOWED_IPS=allowed):
+                    self.assertEqual(
+                        self.client.get(reverse('metrics')).status_code, 403
+                    )
+
+
+class TestRunnerTests(SimpleTestCase):
+    def test_cache_in_memory(self):
+        """Тесты не трогают общий кеш рабочего сервера."""
+        self.assertEqual(
+            settings.CACHES['default']['BACKEND'],
+            'django.core.cache.backends.locmem.LocMemCache',
+        )
+
+    def test_metrics_outside_base_dir(self):
+        """Тестовый прогон не пишет метрики в рабочий файл."""
+        self.assertFalse(
+            settings.METRICS_PATH.startswith(str(settings.BASE_DIR))
+        )
+
+
+def _record_in_child():
+    # Буфер родителя достался потомку при fork: он не его
+    metrics.take()
+    metrics.REQUESTS.inc(('v', 'GET', 200), 2)
+    metrics.flush()
@@ -0,0 +1,52 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(PROFILING_SAMPLE_RATE=1.0)
+class RequestProfilingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def get_profile(self, url):
+        with self.assertLogs('core.profiling', 'INFO') as logs:
+            response = self.client.get(url)
+        return response, json.loads(logs.records[-1].getMessage())
+
+    def test_server_timing_and_log(self):
+        """Время БД, шаблонов и кеша — в заголовке и в строке лога."""
+        response, record = self.get_profile(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'cache;dur=', 'total;dur='):
+            self.assertIn(metric, timing)
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertIn(f'desc="{record["queries"]} queries"', timing)
+
+    def test_cache_hits_counted(self):
+        """Повторный запрос берёт страницу из кеша: попадания растут."""
+        url = reverse('posts:profile', args=['author'])
+        _, first = self.get_profile(url)
+        _, second = self.get_profile(url)
+        self.assertGreater(first['cache_misses'], 0)
+        self.assertGreater(second['cache_hits'], first['cache_hits'])
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        """Вне выборки запрос проходит без профиля."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
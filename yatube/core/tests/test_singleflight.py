@@ -0,0 +1,90 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import SimpleTestCase
+
+from ..singleflight import _lock_key, get_or_fill, single_flight
+
+THREADS = 8
+
+
+class Build:
+    """Медленное построение значения, которое считает свои вызовы."""
+
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.calls += 1
+        time.sleep(0.1)
+        return 'page'
+
+
+def run_concurrently(func):
+    barrier = threading.Barrier(THREADS)
+    results = []
+
+    def target():
+        barrier.wait()
+        results.append(func())
+
+    threads = [threading.Thread(target=target) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.build = Build()
+
+    def test_one_fill_for_concurrent_misses(self):
+        """Одновременные промахи строят значение один раз."""
+        results = run_concurrently(
+            lambda: get_or_fill('key', self.build, 60)
+        )
+        self.assertEqual(self.build.calls, 1)
+        self.assertEqual(results, ['page'] * THREADS)
+
+    def test_stale_value_while_refilling(self):
+        """Пока значение перестраивается, остальные получают старое."""
+        get_or_fill('key', lambda: 'old', 60)
+        cache.add(_lock_key('key'), 1)
+        with mock.patch('core.singleflight.time.time',
+                        return_value=time.time() + 61):
+            self.assertEqual(get_or_fill('key', self.build, 60), 'old')
+        self.assertEqual(self.build.calls, 0)
+
+    def test_decorator(self):
+        @single_flight(lambda name: f'hello:{name}', 60)
+        def hello(name):
+            return self.build() + name
+
+        results = run_concurrently(lambda: hello('!'))
+        self.assertEqual(results, ['page!'] * THREADS)
+        self.assertEqual(self.build.calls, 1)
+
+    def test_template_tag_fills_once_per_expiry(self):
+        """Фрагмент строится один раз на каждое истечение срока."""
+        template = Template(
+            '{% load singleflight %}'
+            '{% singleflight 60 index_page %}{{ build }}{% endsingleflight %}'
+        )
+
+        def render():
+            return template.render(Context({'build': self.build}))
+
+        self.assertEqual(run_concurrently(render), ['page'] * THREADS)
+        self.assertEqual(self.build.calls, 1)
+        with mock.patch('core.singleflight.time.time',
+                        return_value=time.time() + 61):
+            self.assertEqual(run_concurrently(render), ['page'] * THREADS)
+        self.assertEqual(self.build.calls, 2)
@@ -1,6 +1,11 @@
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import render
 from http import HTTPStatus
 
+from .metrics import CONTENT_TYPE, exposition
+
 
 def page_not_found(request, exception):
     # Переменная exception содержит отладочную информацию;
@@ -30,3 +35,9 @@ def csrf_failure(request, reason=''):
     return render(
         request, 'core/403csrf.html',
     )
+
+
+def metrics(request):
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise PermissionDenied
+    return HttpResponse(exposition(), content_type=CONTENT_TYPE)
@@ -0,0 +1,92 @@
+"""
+Массовые операции над постами.
+
+bulk_create и bulk_update не посылают сигналов, поэтому всё, что
+сигналы делают для одиночного поста (версии кеша, счётчики, лента
+подписчиков, поисковый индекс), здесь выполняется пачкой на все
+посты сразу и в той же транзакции, что и запись.
+"""
+from collections import Counter
+
+from django.db import NotSupportedError, connection, transaction
+
+from . import cache, counters, search, timeline
+from .models import Post
+
+BATCH_SIZE = 500
+
+
+def _scopes(posts, *group_ids):
+    scopes = {cache.INDEX}
+    scopes.update(cache.author_scope(post.author_id) for post in posts)
+    scopes.update(cache.group_scope(post.group_id) for post in posts)
+    scopes.update(cache.group_scope(group_id) for group_id in group_ids)
+    return scopes
+
+
+def _assign_ids(posts):
+    """
+    Проставляет id постам после bulk_create.
+
+    SQLite не возвращает id вставленных строк. Внутри транзакции запись
+    в базу удерживает блокировку, поэтому наши строки — последние по id,
+    и идут они в порядке вставки (AUTOINCREMENT). На других СУБД
+    блокировки на всю базу нет, и так угадывать id нельзя.
+    """
+    if all(post.pk is not None for post in posts):
+        return
+    if connection.vendor != 'sqlite' or not connection.in_atomic_block:
+        raise NotSupportedError(
+            'id после bulk_create угадываются только в транзакции SQLite'
+        )
+    ids = sorted(
+        Post.objects.order_by('-pk').values_list('pk', flat=True)[:len(posts)]
+    )
+    for post, pk in zip(posts, ids):
+        post.pk = pk
+
+
+def create_posts(posts):
+    """Сохраняет новые посты одной транзакцией и возвращает их с id."""
+    posts = list(posts)
+    if not posts:
+        return posts
+    with transaction.atomic():
+        Post.objects.bulk_create(posts, batch_size=BATCH_SIZE)
+        if not connection.features.can_return_ids_from_bulk_insert:
+            _assign_ids(posts)
+        timeline.fan_out(posts)
+        for author_id, n in Counter(p.author_id for p in posts).items():
+            counters.change_user(author_id, posts_count=n)
+        for group_id, n in Counter(p.group_id for p in posts).items():
+            counters.change_group(group_id, n)
+        search.index_posts([post.pk for post in posts])
+    cache.bump(*_scopes(posts))
+    return posts
+
+
+def update_posts(posts, fields):
+    """
+    Сохраняет изменённые поля постов одной транзакцией.
+
+    Прежние группы постов берутся из базы, чтобы перенести счётчики.
+    """
+    posts = list(posts)
+    if not posts or not fields:
+        return posts
+    with transaction.atomic():
+        old_groups = dict(
+            Post.objects.filter(
+                pk__in=[post.pk for post in posts]
+            ).values_list('pk', 'group_id')
+        )
+        Post.objects.bulk_update(posts, fields, batch_size=BATCH_SIZE)
+        moved = [p for p in posts if old_groups.get(p.pk) != p.group_id]
+        for group_id, n in Counter(old_groups[p.pk] for p in moved).items():
+            counters.change_group(group_id, -n)
+        for group_id, n in Counter(p.group_id for p in moved).items():
+            counters.change_group(group_id, n)
+        search.index_posts([post.pk for post in posts])
+    cache.bump(*_scopes(posts, *old_groups.values()))
+    return posts
+
@@ -0,0 +1,102 @@
+"""
+Версии кешированных фрагментов лент.
+
+Ключ фрагмента включает версию своей области (вся лента, группа, автор,
+комментарии поста).
+Сигналы на сохранение и удаление Post увеличивают версию, и следующий
+запрос строит фрагмент под новым ключом, а старый просто доживает свой
+срок в кеше. Поэтому фрагменты можно держать часами и при этом сразу
+показывать новые записи, а истекают они не одновременно.
+
+Вместе с версией хранится время её смены: из пары (версия, время)
+получаются валидаторы ETag и Last-Modified для условных запросов.
+"""
+import time
+
+from django.core.cache import cache
+
+INDEX = 'index'
+GROUPS = 'groups'
+# Просмотры постов в API: сдвигается при записи счётчиков
+# (viewcounts.flush)
+VIEWS = 'views'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def comments_scope(post_id):
+    return f'comments:{post_id}'
+
+
+def views_scope(post_id):
+    # Число просмотров на странице поста
+    return f'views:{post_id}'
+
+
+def profile_scope(user_id):
+    # Шапка профиля: число подписчиков и подписок
+    return f'profile:{user_id}'
+
+
+def _key(scope):
+    return f'posts:version:{scope}'
+
+
+def _changed_key(scope):
+    return f'posts:changed:{scope}'
+
+
+def _initial():
+    # Версия с отметкой времени не совпадёт с версией, вытесненной из кеша
+    return int(time.time() * 1000)
+
+
+def get_version(scope):
+    """Текущая версия области; отсутствующая версия создаётся."""
+    key = _key(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial(), None)
+        version = cache.get(key)
+    return version
+
+
+def get_state(*scopes):
+    """
+    Пары (версия, время смены) для областей одним обращением к кешу.
+
+    Если время смены неизвестно (вытеснено из кеша), считаем, что
+    область изменилась сейчас: так Last-Modified не окажется в прошлом.
+    """
+    keys = [_key(scope) for scope in scopes]
+    keys += [_changed_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    state = []
+    for scope in scopes:
+        version = found.get(_key(scope))
+        if version is None:
+            version = get_version(scope)
+        changed = found.get(_changed_key(scope))
+        if changed is None:
+            changed = time.time()
+            cache.add(_changed_key(scope), changed, None)
+        state.append((version, changed))
+    return state
+
+
+def bump(*scopes):
+    """Увеличивает версии областей, делая их фрагменты недействительными."""
+    now = time.time()
+    for scope in scopes:
+        key = _key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial(), None)
+        cache.set(_changed_key(scope), now, None)
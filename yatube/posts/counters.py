@@ -0,0 +1,122 @@
+"""
+Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются атомарным UPDATE ... SET n = n + 1 из сигналов
+на создание и удаление Post, Comment и Follow в одной транзакции
+с самой записью (models.AtomicSaveMixin), поэтому страницы читают
+готовые числа вместо COUNT(*). Если счётчики всё же разъехались
+(например, после bulk_create, который сигналов не шлёт), их выравнивает
+команда reconcile_counters.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+STATS_FIELDS = (
+    'posts_count', 'comments_count', 'followers_count', 'following_count',
+)
+
+
+def _apply(queryset, deltas):
+    # Greatest не даёт разъехавшемуся счётчику уйти ниже нуля
+    return queryset.update(**{
+        name: Greatest(F(name) + delta, 0) for name, delta in deltas.items()
+    })
+
+
+def change_user(user_id, **deltas):
+    """Сдвигает счётчики пользователя, например change_user(1, posts_count=1)."""
+    with transaction.atomic():
+        updated = _apply(AuthorStats.objects.filter(user_id=user_id), deltas)
+        # Строки ещё нет (пользователь старше счётчиков) — считаем с нуля.
+        # Уменьшение пропускаем: значит, пользователь как раз удаляется.
+        if not updated and min(deltas.values()) > 0:
+            reconcile_users(User.objects.filter(pk=user_id))
+
+
+def change_group(group_id, delta):
+    if group_id is not None:
+        _apply(Group.objects.filter(pk=group_id), {'posts_count': delta})
+
+
+def change_post(post_id, delta):
+    _apply(Post.objects.filter(pk=post_id), {'comment_count': delta})
+
+
+def stats_for(user):
+    """Счётчики пользователя; при отсутствии строки она досчитывается."""
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        reconcile_users(User.objects.filter(pk=user.pk))
+        return AuthorStats.objects.get(user=user)
+
+
+def _counts(queryset, field):
+    return dict(
+        queryset.values_list(field).annotate(n=Count('pk')).order_by()
+    )
+
+
+def reconcile_users(users):
+    """Пересчитывает счётчики пользователей из queryset users."""
+    user_ids = list(users.values_list('pk', flat=True))
+    counts = {
+        'posts_count': _counts(
+            Post.objects.filter(author__in=user_ids), 'author'),
+        'comments_count': _counts(
+            Comment.objects.filter(author__in=user_ids), 'author'),
+        'followers_count': _counts(
+            Follow.objects.filter(author__in=user_ids), 'author'),
+        'following_count': _counts(
+            Follow.objects.filter(user__in=user_ids), 'user'),
+    }
+    existing = AuthorStats.objects.in_bulk(user_ids)
+    to_create, to_update = [], []
+    for user_id in user_ids:
+        stats = existing.get(user_id) or AuthorStats(user_id=user_id)
+        values = {name: counts[name].get(user_id, 0) for name in STATS_FIELDS}
+        if stats.user_id in existing:
+            if all(getattr(stats, k) == v for k, v in values.items()):
+                continue
+            to_update.append(stats)
+        else:
+            to_create.append(stats)
+        for name, value in values.items():
+            setattr(stats, name, value)
+    AuthorStats.objects.bulk_create(to_create, ignore_conflicts=True)
+    AuthorStats.objects.bulk_update(to_update, STATS_FIELDS)
+    return len(to_create) + len(to_update)
+
+
+def reconcile_groups(groups):
+    """Пересчитывает счётчики постов групп из queryset groups."""
+    groups = list(groups)
+    counts = _counts(Post.objects.filter(group__in=groups), 'group')
+    changed = []
+    for group in groups:
+        value = counts.get(group.pk, 0)
+        if group.posts_count != value:
+            group.posts_count = value
+            changed.append(group)
+    Group.objects.bulk_update(changed, ['posts_count'])
+    return len(changed)
+
+
+def reconcile_posts(posts):
+    """Пересчитывает число комментариев постов из queryset posts."""
+    posts = list(posts.only('pk', 'comment_count'))
+    counts = _counts(Comment.objects.filter(post__in=posts), 'post')
+    changed = []
+    for post in posts:
+        value = counts.get(post.pk, 0)
+        if post.comment_count != value:
+            post.comment_count = value
+            changed.append(post)
+    Post.objects.bulk_update(changed, ['comment_count'])
+    return len(changed)
@@ -0,0 +1,113 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from api.pagination import CommentCursorPagination, PostCursorPagination
+from core.paginator import KeysetPaginator
+from posts.models import Comment, Follow, Post, TimelineEntry
+
+
+def bad_plan(plan):
+    """
+    Признаки плохого плана SQLite для страницы ленты: таблица читается
+    целиком (SCAN без USING INDEX) или строки досортировываются во
+    временном B-дереве, то есть порядок не берётся из индекса.
+    """
+    for line in plan.splitlines():
+        if 'SCAN ' in line and 'USING' not in line:
+            return True
+        if 'USE TEMP B-TREE FOR' in line and 'ORDER BY' in line:
+            return True
+    return False
+
+
+def _keyset(queryset, ordering, cursor=None):
+    paginator = KeysetPaginator(queryset, settings.PAGES, ordering=ordering)
+    return paginator.page_queryset(cursor)
+
+
+def _api(queryset, pagination):
+    return queryset.order_by(*pagination.ordering)[:pagination.page_size + 1]
+
+
+def hot_queries():
+    """Запросы горячих страниц и API с типичными параметрами."""
+    now = timezone.now()
+    posts = Post.objects.with_related()
+    feed = ('-pub_date', '-pk')
+    comments = Comment.objects.select_related('author')
+    return [
+        ('index', _keyset(posts, feed)),
+        ('index, курсор', _keyset(posts, feed, [now, 0])),
+        ('group_list', _keyset(posts.filter(group_id=1), feed)),
+        ('profile', _keyset(posts.filter(author_id=1), feed)),
+        ('profile, подписчики',
+         Follow.objects.filter(author_id=1).values('pk')[:1]),
+        ('follow_index', _keyset(
+            TimelineEntry.objects.filter(user_id=1)
+            .select_related('post__author', 'post__group'),
+            ('-pub_date', '-post_id'),
+        )),
+        ('post_detail, комментарии', _keyset(
+            comments.filter(post_id=1), ('created', 'pk')
+        )),
+        ('fan_out, подписчики автора',
+         Follow.objects.filter(author_id__in=[1, 2])
+         .values_list('author_id', 'user_id')),
+        ('api posts', _api(posts, PostCursorPagination)),
+        ('api posts, pub_date', _api(
+            posts.filter(pub_date__gte=now - timedelta(days=1),
+                         pub_date__lt=now),
+            PostCursorPagination,
+        )),
+        ('api posts, group', _api(
+            posts.filter(group_id=1), PostCursorPagination
+        )),
+        ('api posts, author', _api(
+            posts.filter(author__username='user'), PostCursorPagination
+        )),
+        ('api comments', _api(
+            comments.filter(post_id=1), CommentCursorPagination
+        )),
+        ('api comments, author', _api(
+            comments.filter(post_id=1, author__username='user'),
+            CommentCursorPagination,
+        )),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Печатает планы SQLite (EXPLAIN QUERY PLAN) для горячих запросов '
+        'и падает, если какой-то из них читает таблицу целиком или '
+        'сортирует строки мимо индекса. Запускать на базе, заполненной '
+        'командой seed_yatube: на пустых таблицах планировщик может '
+        'выбрать другой план'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help='Собрать статистику (ANALYZE) перед построением планов',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Планы разбираются только для SQLite')
+        if options['analyze']:
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        bad = []
+        for name, queryset in hot_queries():
+            plan = queryset.explain()
+            self.stdout.write(f'{name}\n{plan}\n')
+            if bad_plan(plan):
+                bad.append(name)
+        if bad:
+            raise CommandError(
+                'Запросы без подходящего индекса: ' + ', '.join(bad)
+            )
+        self.stdout.write(self.style.SUCCESS('Все планы используют индексы'))
@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts import counters
+from posts.models import Group, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счётчики пользователей, групп '
+        'и постов'
+    )
+
+    def handle(self, *args, **options):
+        fixed_users = self.reconcile_batches(User, counters.reconcile_users)
+        fixed_groups = counters.reconcile_groups(Group.objects.all())
+        fixed_posts = self.reconcile_batches(Post, counters.reconcile_posts)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков: пользователей {fixed_users}, '
+            f'групп {fixed_groups}, постов {fixed_posts}'
+        ))
+
+    def reconcile_batches(self, model, reconcile):
+        fixed = 0
+        ids = model.objects.order_by('pk').values_list('pk', flat=True)
+        last_id = 0
+        while True:
+            batch = list(ids.filter(pk__gt=last_id)[:BATCH_SIZE])
+            if not batch:
+                return fixed
+            fixed += reconcile(model.objects.filter(pk__in=batch))
+            last_id = batch[-1]
@@ -0,0 +1,54 @@
+import multiprocessing
+
+from django.db import connections
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import generate
+
+
+def _generate(name):
+    try:
+        # Иначе готовые миниатюры остались бы прежними
+        generate(name, force=True)
+    except Exception as error:
+        return name, str(error)
+    return name, None
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново строит миниатюры картинок всех постов в нескольких '
+        'процессах'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=multiprocessing.cpu_count(),
+            help='Число процессов (по умолчанию по числу ядер)'
+        )
+
+    def handle(self, *args, **options):
+        # Список читается здесь: imap_unordered раздаёт задачи из своего
+        # потока, и ленивый итератор открыл бы там второе соединение с БД
+        names = list(
+            Post.objects.exclude(image='').values_list('image', flat=True)
+        )
+        # Дочерние процессы не должны делить соединение с БД родителя
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        done = failed = 0
+        with context.Pool(
+            options['processes'], initializer=connections.close_all
+        ) as pool:
+            for name, error in pool.imap_unordered(
+                _generate, names, chunksize=16
+            ):
+                if error:
+                    failed += 1
+                    self.stderr.write(f'{name}: {error}')
+                else:
+                    done += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово картинок: {done}, с ошибками: {failed}'
+        ))
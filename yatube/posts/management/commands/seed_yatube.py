@@ -0,0 +1,75 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import search, seed
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу пользователями, группами, постами, комментариями '
+        'и подписками для нагрузочных прогонов, например: '
+        'seed_yatube --users 100000 --posts 1000000 (на SQLite — '
+        'минут 15-20 с --timelines --search-index, см. posts/seed.py)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=30000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок на пользователя',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько последних дней распределить посты',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=seed.BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--seed', type=int, default=None,
+            help='Зерно генератора случайных чисел для повторяемых данных',
+        )
+        parser.add_argument(
+            '--password', default=None,
+            help='Пароль всех новых пользователей (по умолчанию входа нет)',
+        )
+        parser.add_argument(
+            '--timelines', action='store_true',
+            help='Разложить посты по лентам подписчиков',
+        )
+        parser.add_argument(
+            '--search-index', action='store_true',
+            help='Пересобрать полнотекстовый индекс',
+        )
+
+    def handle(self, *args, **options):
+        for name in ('users', 'batch_size', 'days'):
+            if options[name] < 1:
+                raise CommandError(f'--{name.replace("_", "-")} должно быть '
+                                   f'больше нуля')
+        started = time.perf_counter()
+        seeder = seed.Seeder(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            days=options['days'],
+            batch_size=options['batch_size'],
+            seed=options['seed'],
+            password=options['password'],
+            log=self.stdout.write,
+        )
+        seeder.run()
+        if options['timelines']:
+            entries = seed.build_timelines(seeder.first_user)
+            self.stdout.write(f'Записей в лентах: {entries}')
+        if options['search_index']:
+            self.stdout.write(f'Проиндексировано постов: {search.rebuild()}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.perf_counter() - started:.1f} с'
+        ))
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+from posts.stemmer import stems
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS posts_search USING fts5('
+        'text, comments, tokenize="unicode61 remove_diacritics 2")'
+    )
+    comments = {}
+    for post_id, text in Comment.objects.values_list('post_id', 'text'):
+        comments.setdefault(post_id, []).extend(stems(text))
+    for post_id, text in Post.objects.values_list('pk', 'text').iterator():
+        schema_editor.execute(
+            'INSERT INTO posts_search (rowid, text, comments) '
+            'VALUES (%s, %s, %s)',
+            [post_id, ' '.join(stems(text)),
+             ' '.join(comments.get(post_id, []))],
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,67 @@
+from django.db import migrations
+
+from posts.stemmer import stems
+
+TOKENIZE = 'tokenize="unicode61 remove_diacritics 2"'
+
+
+def split_comments(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE posts_search USING fts5(text, {TOKENIZE})'
+    )
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS posts_search_comments '
+        f'USING fts5(text, post_id UNINDEXED, {TOKENIZE})'
+    )
+    for post_id, text in Post.objects.values_list('pk', 'text').iterator():
+        schema_editor.execute(
+            'INSERT INTO posts_search (rowid, text) VALUES (%s, %s)',
+            [post_id, ' '.join(stems(text))],
+        )
+    for comment_id, post_id, text in Comment.objects.values_list(
+        'pk', 'post_id', 'text'
+    ).iterator():
+        schema_editor.execute(
+            'INSERT INTO posts_search_comments (rowid, text, post_id) '
+            'VALUES (%s, %s, %s)',
+            [comment_id, ' '.join(stems(text)), post_id],
+        )
+
+
+def join_comments(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    schema_editor.execute('DROP TABLE IF EXISTS posts_search_comments')
+    schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE posts_search USING fts5('
+        f'text, comments, {TOKENIZE})'
+    )
+    comments = {}
+    for post_id, text in Comment.objects.values_list('post_id', 'text'):
+        comments.setdefault(post_id, []).extend(stems(text))
+    for post_id, text in Post.objects.values_list('pk', 'text').iterator():
+        schema_editor.execute(
+            'INSERT INTO posts_search (rowid, text, comments) '
+            'VALUES (%s, %s, %s)',
+            [post_id, ' '.join(stems(text)),
+             ' '.join(comments.get(post_id, []))],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(split_comments, join_comments),
+    ]
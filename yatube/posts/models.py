@@ -1,5 +1,5 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, router, transaction
 
 User = get_user_model()
 
@@ -8,12 +8,35 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=100, unique=True, blank=True)
     description = models.TextField()
+    # Счётчик поддерживается сигналами, см. posts/counters.py
+    posts_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.title
 
 
-class Post(models.Model):
+class AtomicSaveMixin:
+    """
+    Запись модели и сдвиг счётчиков в её post_save (posts/signals.py)
+    идут одной транзакцией: сбой между ними откатывает обе. Удаление
+    и так атомарно — Collector.delete шлёт post_delete внутри транзакции.
+    """
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self
+        )
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+
+class PostQuerySet(models.QuerySet):
+    def with_related(self):
+        """Подтягивает автора и группу одним JOIN вместо запроса на пост."""
+        return self.select_related('author', 'group')
+
+
+class Post(AtomicSaveMixin, models.Model):
     text = models.TextField(
         help_text='Введите текст поста'
     )
@@ -38,15 +61,58 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    # Копится в памяти процесса и сбрасывается пачками, см. posts/viewcounts.py
+    views = models.PositiveIntegerField(
+        'Просмотры',
+        default=0,
+        editable=False
+    )
+    # Ведётся сигналами комментариев, см. posts/counters.py
+    comment_count = models.PositiveIntegerField(
+        'Комментарии',
+        default=0,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
+        # Ленты и фильтры API читают посты по убыванию (pub_date, id)
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_feed_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_feed_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_feed_idx'
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.text[:15]
 
+    # Счётчики меняются только атомарными UPDATE (viewcounts.flush,
+    # counters.change_post)
+    COUNTER_FIELDS = ('views', 'comment_count')
+
+    def save(self, *args, **kwargs):
+        # Правка поста не должна затирать счётчики, изменённые после
+        # того, как пост был прочитан
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 
-class Comment(models.Model):
+class Comment(AtomicSaveMixin, models.Model):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
@@ -65,12 +131,18 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('created',)
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx'
+            ),
+        ]
 
     def __str__(self) -> str:
         return f'Комментарий {self.author.username} к посту {self.post.id}'
 
 
-class Follow(models.Model):
+class Follow(AtomicSaveMixin, models.Model):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -81,7 +153,9 @@ class Follow(models.Model):
         User,
         on_delete=models.CASCADE,
         related_name='following',
-        verbose_name='автор'
+        verbose_name='автор',
+        # Поиск по автору покрывает индекс follow_author_user_idx
+        db_index=False
     )
 
     class Meta:
@@ -91,3 +165,60 @@ class Follow(models.Model):
                 name='unique_following'
             ),
         ]
+        # Подписчики автора (лента, счётчики) читаются только из индекса
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx'
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Запись ленты подписок, разложенная по подписчикам при публикации."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Запись'
+    )
+    # Копия Post.pub_date: лента читается одним диапазоном по индексу
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ('-pub_date', '-post_id')
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_feed_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry'
+            ),
+        ]
+
+
+class AuthorStats(models.Model):
+    """Счётчики пользователя, поддерживаемые сигналами posts/counters.py."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    comments_count = models.PositiveIntegerField('Комментариев', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    def __str__(self) -> str:
+        return f'Счётчики {self.user_id}'
@@ -0,0 +1,163 @@
+"""
+Кеширование страниц лент и постов.
+
+Представление во время построения сообщает, от каких областей кеша
+(posts/cache.py) зависит страница — depends_on(request, ...). Список
+областей запоминается по пути страницы (без параметров: от курсора
+он не зависит), и следующие запросы узнают версии областей одним
+обращением к кешу, ещё до запросов к БД:
+
+* из версий и времени их смены строятся ETag и Last-Modified, и
+  запрос с актуальными If-None-Match / If-Modified-Since сразу получает
+  304 (Last-Modified — только анонимам: он не зависит от пользователя);
+* анонимный запрос без cookie сессии получает готовый ответ из кеша:
+  ни представление, ни ORM, ни шаблоны не выполняются.
+
+Публикация, правка поста или новый комментарий (сигналы сдвигают
+версии) сразу меняют ключи и валидаторы ровно тех страниц, где они видны.
+Страница в кеше свежа PAGE_CACHE_TIMEOUT секунд, после этого её ещё
+столько же отдают устаревшей, пока один из запросов строит новую
+(stale-while-revalidate, см. core/singleflight.py).
+"""
+import hashlib
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag, urlencode
+
+from core.singleflight import DontCache, get_or_fill
+from . import cache
+
+
+# Параметры запроса, от которых зависят кешируемые страницы. Запросы
+# с другими параметрами или с кривыми значениями идут мимо кеша: иначе
+# каждый ?x=<случайное> заводил бы в кеше новые записи
+PAGE_PARAMS = {
+    'cursor': re.compile(r'[A-Za-z0-9_-]{1,512}'),
+    'page': re.compile(r'[0-9]{1,6}'),
+}
+
+
+def cache_path(request):
+    """Адрес страницы для ключей кеша; None — страницу не кешировать."""
+    params = []
+    for name, values in sorted(request.GET.lists()):
+        pattern = PAGE_PARAMS.get(name)
+        if pattern is None or len(values) != 1:
+            return None
+        if not pattern.fullmatch(values[0]):
+            return None
+        params.append((name, values[0]))
+    if not params:
+        return request.path
+    return f'{request.path}?{urlencode(params)}'
+
+
+def depends_on(request, *scopes):
+    """Отмечает, что страница зависит от областей кеша scopes."""
+    request._page_scopes = getattr(request, '_page_scopes', ()) + scopes
+
+
+def is_anonymous(request):
+    # Без cookie сессии пользователь точно анонимен, и проверять это
+    # можно, не обращаясь к таблице сессий
+    return (
+        settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and 'messages' not in request.COOKIES
+    )
+
+
+def _scopes_key(request):
+    # Только путь: параметры задаёт клиент, и каждый новый курсор
+    # заводил бы ещё одну запись
+    return 'pages:scopes:' + hashlib.md5(request.path.encode()).hexdigest()
+
+
+def _page_key(path, state):
+    versions = repr([version for version, _ in state])
+    digest = hashlib.md5(f'{path}|{versions}'.encode()).hexdigest()
+    return 'pages:page:' + digest
+
+
+def _validators(request, path, state):
+    # Страница зависит и от того, кто её смотрит, и от CSRF-токена в формах
+    user = '' if is_anonymous(request) else str(request.user.pk)
+    digest = hashlib.md5('|'.join((
+        path,
+        user,
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        repr([version for version, _ in state]),
+    )).encode()).hexdigest()
+    return quote_etag(digest), int(max(changed for _, changed in state))
+
+
+def _cacheable(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_USED')
+    )
+
+
+def cached_page(view):
+    """Условные GET и кеш для анонимов для представления view."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        path = cache_path(request)
+        if request.method not in ('GET', 'HEAD') or path is None:
+            return view(request, *args, **kwargs)
+        scopes = default_cache.get(_scopes_key(request))
+
+        def build():
+            response = view(request, *args, **kwargs)
+            patch_vary_headers(response, ('Cookie',))
+            built_scopes = getattr(request, '_page_scopes', None)
+            if response.status_code == 200 and built_scopes != scopes:
+                # От чего зависит страница, узнаём при первой постройке;
+                # такой ответ не кешируем и валидаторов не ставим
+                default_cache.set(
+                    _scopes_key(request), built_scopes,
+                    settings.FEED_CACHE_TIMEOUT,
+                )
+                raise DontCache(response)
+            if not _cacheable(request, response):
+                raise DontCache(response)
+            return response
+
+        if scopes is None:
+            try:
+                return build()
+            except DontCache as result:
+                return result.value
+        state = cache.get_state(*scopes)
+        etag, last_modified = _validators(request, path, state)
+        if not is_anonymous(request):
+            # If-Modified-Since без ETag вернул бы 304 и на чужую страницу
+            last_modified = None
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        if is_anonymous(request):
+            response = get_or_fill(
+                _page_key(path, state), build, settings.PAGE_CACHE_TIMEOUT
+            )
+        else:
+            try:
+                response = build()
+            except DontCache as result:
+                response = result.value
+        if response.status_code == 200 and (
+            getattr(request, '_page_scopes', scopes) == scopes
+        ):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+    return wrapper
@@ -0,0 +1,99 @@
+"""
+Страница поста одним объектом из кеша.
+
+post_detail показывает пост, его автора и группу, число постов автора
+и первую страницу комментариев с их авторами (дальше комментарии
+листаются по ключу (created, id), см. comments_page). PostPage
+собирает всё это двумя запросами
+и кладётся в кеш целиком; попадание в кеш не делает ни одного запроса
+к БД. Вместе с объектом хранятся версии областей кеша, от которых он
+зависит (posts/cache.py): правка поста, новый или удалённый комментарий
+(в том числе через API) и смена группы сдвигают версии, и следующее
+чтение собирает объект заново.
+"""
+from django.conf import settings
+from django.core.cache import cache as default_cache
+
+from core.paginator import KeysetPaginator
+from . import cache
+from .counters import stats_for
+from .models import Post
+
+
+class PostPage:
+    """Пост с автором, группой, числом постов автора и первой страницей
+    комментариев."""
+
+    def __init__(self, post, post_count, comments):
+        self.post = post
+        self.post_count = post_count
+        self.comments = comments
+
+    @property
+    def scopes(self):
+        return scopes_for(self.post.pk, self.post.author_id)
+
+
+def scopes_for(post_id, author_id):
+    return (
+        cache.GROUPS,
+        cache.author_scope(author_id),
+        cache.comments_scope(post_id),
+        cache.views_scope(post_id),
+    )
+
+
+def comments_page(post, cursor=None):
+    """Страница комментариев поста (KeysetPage) по курсору."""
+    paginator = KeysetPaginator(
+        post.comments.select_related('author'),
+        settings.COMMENTS_PER_PAGE,
+        ordering=('created', 'pk'),
+    )
+    return paginator.get_page(cursor)
+
+
+def _key(post_id):
+    return f'posts:post_page:{post_id}'
+
+
+def _versions(scopes):
+    return [version for version, _ in cache.get_state(*scopes)]
+
+
+def build(post_id):
+    """Собирает PostPage из базы; None, если поста нет."""
+    post = Post.objects.with_related().select_related(
+        'author__stats'
+    ).filter(pk=post_id).first()
+    if post is None:
+        return None
+    return PostPage(
+        post, stats_for(post.author).posts_count, comments_page(post)
+    )
+
+
+def get(post_id):
+    """PostPage из кеша или из базы; None, если поста нет."""
+    key = _key(post_id)
+    entry = default_cache.get(key)
+    if entry is not None:
+        page, versions = entry
+        if versions == _versions(page.scopes):
+            return page
+        author_id = page.post.author_id
+    else:
+        author_id = Post.objects.filter(
+            pk=post_id
+        ).values_list('author_id', flat=True).first()
+        if author_id is None:
+            return None
+    # Версии читаем до сборки: запись, случившаяся во время сборки,
+    # сдвинет их, и устаревший объект не будет принят за свежий
+    versions = _versions(scopes_for(post_id, author_id))
+    page = build(post_id)
+    if page is not None:
+        default_cache.set(
+            key, (page, versions), settings.FEED_CACHE_TIMEOUT
+        )
+    return page
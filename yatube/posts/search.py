@@ -0,0 +1,261 @@
+"""
+Полнотекстовый поиск по постам и комментариям.
+
+Индекс — две виртуальные таблицы SQLite FTS5 с основами слов
+(posts/stemmer.py): posts_search (rowid — id поста, текст поста)
+и posts_search_comments (rowid — id комментария, его текст и id поста).
+Каждый комментарий — своя строка, так что запись комментария трогает
+только её, сколько бы комментариев ни было у поста. Индекс обновляется
+сигналами при сохранении и удалении постов и комментариев, а
+пересобирается командой rebuild_search_index.
+
+Пост находится, если под запрос подходит его текст или хотя бы один
+комментарий. Релевантность — сумма bm25 текста и лучшего комментария
+с весами WEIGHTS (совпадения в тексте весят больше); результаты
+листаются по ключу (релевантность, id) без OFFSET.
+
+На других СУБД поиск сводится к icontains по тексту поста.
+"""
+import base64
+import json
+
+from django.db import connection, transaction
+
+from core.paginator import NEXT, PREVIOUS, KeysetPage, KeysetPaginator
+from .models import Comment, Post
+from .stemmer import stems
+
+TABLE = 'posts_search'
+COMMENTS_TABLE = 'posts_search_comments'
+# Вес bm25 текста поста и лучшего комментария в релевантности
+WEIGHTS = (1.0, 0.3)
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def _replace(table, columns, rows):
+    """Заменяет строки индекса: rows — кортежи (rowid, *columns)."""
+    names = ', '.join(('rowid',) + columns)
+    values = ', '.join(['%s'] * (len(columns) + 1))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {table} WHERE rowid = %s',
+            [(row[0],) for row in rows],
+        )
+        cursor.executemany(
+            f'INSERT INTO {table} ({names}) VALUES ({values})',
+            rows,
+        )
+
+
+def _remove(table, rowid):
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [rowid])
+
+
+def index_posts(post_ids):
+    """Переиндексирует тексты постов (комментарии — отдельные строки)."""
+    if not available() or not post_ids:
+        return
+    _replace(TABLE, ('text',), [
+        (post_id, ' '.join(stems(text)))
+        for post_id, text in Post.objects.filter(
+            pk__in=list(post_ids)
+        ).values_list('pk', 'text')
+    ])
+
+
+def index_post(post_id):
+    index_posts([post_id])
+
+
+def remove_post(post_id):
+    _remove(TABLE, post_id)
+
+
+def index_comments(comments):
+    """Переиндексирует комментарии — только их собственные строки."""
+    if not available() or not comments:
+        return
+    _replace(COMMENTS_TABLE, ('text', 'post_id'), [
+        (comment.pk, ' '.join(stems(comment.text)), comment.post_id)
+        for comment in comments
+    ])
+
+
+def index_comment(comment):
+    index_comments([comment])
+
+
+def remove_comment(comment_id):
+    _remove(COMMENTS_TABLE, comment_id)
+
+
+def _batches(queryset, batch_size):
+    """Объекты queryset пачками по ключу pk, без OFFSET."""
+    queryset = queryset.order_by('pk')
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_id)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].pk
+
+
+def rebuild(batch_size=1000):
+    """Строит индекс заново по всем постам; возвращает их число."""
+    if not available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(f'DELETE FROM {COMMENTS_TABLE}')
+    indexed = 0
+    # Пачка — одна транзакция: в автокоммите SQLite фиксирует (и ждёт
+    # диска) каждую вставленную строку, и пересборка шла в десятки раз
+    # дольше
+    for batch in _batches(Post.objects.only('pk', 'text'), batch_size):
+        with transaction.atomic():
+            _replace(TABLE, ('text',), [
+                (post.pk, ' '.join(stems(post.text))) for post in batch
+            ])
+        indexed += len(batch)
+    comments = Comment.objects.only('pk', 'post_id', 'text')
+    for batch in _batches(comments, batch_size):
+        with transaction.atomic():
+            index_comments(batch)
+    return indexed
+
+
+def match_expression(query):
+    """FTS5-выражение: все основы слов запроса, каждая — как префикс."""
+    return ' '.join(f'"{word}"*' for word in stems(query))
+
+
+def filter_posts(queryset, query):
+    """
+    Посты queryset, подходящие под запрос.
+
+    Индекс подставляется в запрос подзапросом: id совпадений не
+    выгружаются в Python, сколько бы их ни было.
+    """
+    expression = match_expression(query)
+    if not expression:
+        return queryset.none()
+    if not available():
+        return queryset.filter(text__icontains=query)
+    # Не pk__in=RawSQL(...): Django берёт подзапрос во вторые скобки,
+    # и SQLite сравнивает id с одним скалярным значением
+    column = '.'.join(
+        connection.ops.quote_name(name)
+        for name in (queryset.model._meta.db_table, 'id')
+    )
+    return queryset.extra(
+        where=[
+            f'{column} IN ('
+            f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s '
+            f'UNION SELECT post_id FROM {COMMENTS_TABLE} '
+            f'WHERE {COMMENTS_TABLE} MATCH %s)'
+        ],
+        params=[expression, expression],
+    )
+
+
+def _encode(direction, score, post_id):
+    raw = json.dumps([direction, score, post_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode(cursor):
+    if not cursor:
+        return None
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(cursor + padding)
+        direction, score, post_id = json.loads(raw.decode())
+        if direction not in (NEXT, PREVIOUS):
+            return None
+        return direction, float(score), int(post_id)
+    except Exception:
+        return None
+
+
+def _ranked(expression, after, forward, limit):
+    """Пары (id, релевантность) строго после ключа after (или до него)."""
+    # LIMIT -1 не даёт SQLite развернуть подзапрос в агрегат:
+    # bm25 можно звать только в самом запросе с MATCH
+    sql = (
+        f'SELECT post_id, score FROM ('
+        f' SELECT post_id, SUM(score) AS score FROM ('
+        f'  SELECT rowid AS post_id, bm25({TABLE}) * %s AS score'
+        f'  FROM {TABLE} WHERE {TABLE} MATCH %s'
+        f'  UNION ALL'
+        f'  SELECT post_id, MIN(score) * %s FROM ('
+        f'   SELECT CAST(post_id AS INTEGER) AS post_id,'
+        f'   bm25({COMMENTS_TABLE}) AS score'
+        f'   FROM {COMMENTS_TABLE} WHERE {COMMENTS_TABLE} MATCH %s LIMIT -1'
+        f'  ) GROUP BY post_id'
+        f' ) GROUP BY post_id'
+        f')'
+    )
+    params = [WEIGHTS[0], expression, WEIGHTS[1], expression]
+    if after is not None:
+        op = '>' if forward else '<'
+        sql += f' WHERE score {op} %s OR (score = %s AND post_id {op} %s)'
+        params += [after[0], after[0], after[1]]
+    order = '' if forward else ' DESC'
+    sql += f' ORDER BY score{order}, post_id{order} LIMIT %s'
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def search(query, per_page, cursor=None):
+    """
+    Страница результатов поиска (KeysetPage с постами).
+
+    Посты подтягиваются вместе с авторами и группами одним запросом.
+    """
+    expression = match_expression(query)
+    if not expression:
+        return KeysetPage([])
+    posts = Post.objects.with_related()
+    if not available():
+        paginator = KeysetPaginator(
+            posts.filter(text__icontains=query), per_page
+        )
+        return paginator.get_page(cursor)
+    decoded = _decode(cursor)
+    limit = per_page + 1
+    rows = []
+    if decoded is not None and decoded[0] == PREVIOUS:
+        rows = _ranked(expression, decoded[1:], False, limit)
+        has_previous = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_next = bool(rows)
+    if not rows:
+        if decoded is not None and decoded[0] == PREVIOUS:
+            decoded = None
+        rows = _ranked(
+            expression, decoded[1:] if decoded else None, True, limit
+        )
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_previous = decoded is not None and bool(rows)
+    found = posts.in_bulk([post_id for post_id, _ in rows])
+    # Пост мог быть удалён, а индекс ещё не обновлён
+    object_list = [found[post_id] for post_id, _ in rows if post_id in found]
+    first, last = (rows[0], rows[-1]) if rows else (None, None)
+    return KeysetPage(
+        object_list,
+        cursor=cursor if decoded is not None else '',
+        next_cursor=_encode(NEXT, last[1], last[0]) if has_next else '',
+        previous_cursor=(
+            _encode(PREVIOUS, first[1], first[0]) if has_previous else ''
+        ),
+    )
@@ -0,0 +1,327 @@
+"""
+Генерация данных большого объёма для нагрузочных прогонов и бенчмарков.
+
+Всё пишется через bulk_create пачками по batch_size, поэтому сигналы
+не срабатывают: счётчики (AuthorStats, Group.posts_count,
+Post.comment_count) считаются по ходу генерации и записываются сразу
+готовыми. В памяти держатся только текущая пачка и счётчики
+пользователей и групп, так что память не растёт с числом постов.
+
+Активность распределена по степенному закону: немногие авторы пишут
+большую часть постов, немногие собирают большую часть подписчиков,
+а число подписок у пользователя — хвост Парето. Самые пишущие и самые
+читаемые авторы выбираются независимо: иначе лента подписок (посты
+× подписчики автора) росла бы квадратично, а не как посты × подписки.
+
+id новых строк назначаются заранее (с max(id) + 1): комментарии
+ссылаются на посты той же пачки, не перечитывая их id из базы.
+
+Время растёт чуть быстрее линейного. На SQLite 50 тыс. постов со
+100 тыс. комментариев строятся примерно за 20 с, а вместе с лентами
+и полнотекстовым индексом (--timelines --search-index) — за 35 с;
+300 тыс. постов с 600 тыс. комментариев и тем и другим — около 4 минут.
+10 млн постов, таким образом, — это часы, а не минуты.
+"""
+import itertools
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, reset_queries, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import cache
+from .models import AuthorStats, Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+# Показатель степенного закона популярности авторов (Ципф)
+POPULARITY_EXPONENT = 1.0
+# Показатель хвоста Парето для числа подписок пользователя
+FOLLOWS_ALPHA = 2.0
+# Число разных текстов постов и комментариев
+TEXTS = 10000
+
+WORDS = (
+    'кот', 'пёс', 'город', 'утро', 'вечер', 'дорога', 'книга', 'море',
+    'солнце', 'дождь', 'друг', 'работа', 'музыка', 'поезд', 'зима',
+    'лето', 'новый', 'старый', 'красивый', 'быстрый', 'тихий', 'большой',
+    'читать', 'писать', 'гулять', 'смотреть', 'думать', 'ждать', 'сегодня',
+    'вчера', 'очень', 'снова', 'потом', 'здесь', 'всегда', 'никогда',
+)
+
+
+@contextmanager
+def explicit_dates():
+    """Отключает auto_now_add: даты постов и комментариев задаём сами."""
+    fields = [
+        Post._meta.get_field('pub_date'),
+        Comment._meta.get_field('created'),
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _shares(total, parts, start, count):
+    """Сколько из total приходится на части [start, start + count)."""
+    return total * (start + count) // parts - total * start // parts
+
+
+class Seeder:
+    def __init__(self, users, groups, posts, comments, follows, days=365,
+                 batch_size=BATCH_SIZE, seed=None, password=None,
+                 log=None):
+        self.users = users
+        self.groups = groups
+        self.posts = posts
+        self.comments = comments
+        self.follows = follows
+        self.days = days
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+        self.password = (
+            make_password(password) if password else make_password(None)
+        )
+        self.log = log or (lambda message: None)
+        # Веса популярности: i-й пользователь популярнее (i + 1)-го
+        weights = [
+            1 / (rank + 1) ** POPULARITY_EXPONENT for rank in range(users)
+        ]
+        self.cum_weights = list(itertools.accumulate(weights))
+        # Свой порядок популярности для подписок, см. описание модуля
+        self.follow_ranks = list(range(users))
+        self.random.shuffle(self.follow_ranks)
+        self.stats = {
+            name: [0] * users for name in (
+                'posts_count', 'comments_count',
+                'followers_count', 'following_count',
+            )
+        }
+        self.group_posts = [0] * groups
+        # Тексты берутся из готового набора: генерация слов на каждую
+        # строку заметно тормозила вставку миллионов постов
+        self.texts = [self.make_text() for _ in range(TEXTS)]
+
+    def run(self):
+        """Заполняет базу; id новых пользователей начинаются с first_user."""
+        if self.users < 1:
+            raise ValueError('Нужен хотя бы один пользователь')
+        self.first_user = _next_id(User)
+        self.first_group = _next_id(Group)
+        self.first_post = _next_id(Post)
+        self.seed_users()
+        self.seed_groups()
+        self.seed_follows()
+        with explicit_dates():
+            self.seed_posts()
+        self.seed_stats()
+        self.reset_sequences()
+        cache.bump(cache.INDEX, cache.GROUPS)
+
+    def popular(self, k):
+        """k номеров пользователей с учётом популярности."""
+        return self.random.choices(
+            range(self.users), cum_weights=self.cum_weights, k=k
+        )
+
+    def forget_queries(self):
+        # При DEBUG Django копит тексты запросов, а INSERT на тысячи строк
+        # занимает мегабайты: без сброса память росла бы с объёмом данных
+        reset_queries()
+
+    def followed(self, k):
+        """k номеров пользователей с учётом числа подписчиков."""
+        return [self.follow_ranks[rank] for rank in self.popular(k)]
+
+    def save(self, model, objects):
+        # batch_size задаёт размер транзакции; размер INSERT Django
+        # подбирает сам под лимиты СУБД (в SQLite — 999 параметров)
+        with transaction.atomic():
+            model.objects.bulk_create(objects)
+        self.forget_queries()
+
+    def seed_users(self):
+        for batch in _batches(range(self.users), self.batch_size):
+            self.save(User, [
+                User(
+                    pk=self.first_user + i,
+                    username=f'seed{self.first_user + i}',
+                    password=self.password,
+                )
+                for i in batch
+            ])
+        self.log(f'Пользователей: {self.users}')
+
+    def seed_groups(self):
+        self.save(Group, [
+            Group(
+                pk=self.first_group + i,
+                title=f'Группа {self.first_group + i}',
+                slug=f'seed-{self.first_group + i}',
+                description=self.text(),
+            )
+            for i in range(self.groups)
+        ])
+        self.log(f'Групп: {self.groups}')
+
+    def follow_count(self):
+        # Хвост Парето со средним self.follows
+        scale = self.follows * (FOLLOWS_ALPHA - 1) / FOLLOWS_ALPHA
+        count = int(scale * self.random.paretovariate(FOLLOWS_ALPHA))
+        return min(count, self.users - 1)
+
+    def authors_for(self, user):
+        wanted = self.follow_count()
+        authors = set()
+        # Популярные авторы выпадают часто: число попыток ограничено
+        for _ in range(3):
+            authors.update(self.followed(wanted - len(authors)))
+            authors.discard(user)
+            if len(authors) >= wanted:
+                break
+        return authors
+
+    def follow_rows(self):
+        for user in range(self.users):
+            for author in self.authors_for(user):
+                self.stats['following_count'][user] += 1
+                self.stats['followers_count'][author] += 1
+                yield Follow(
+                    user_id=self.first_user + user,
+                    author_id=self.first_user + author,
+                )
+
+    def seed_follows(self):
+        total = 0
+        for batch in _batches(self.follow_rows(), self.batch_size):
+            self.save(Follow, batch)
+            total += len(batch)
+        self.log(f'Подписок: {total}')
+
+    def make_text(self):
+        words = self.random.choices(WORDS, k=self.random.randint(5, 40))
+        return ' '.join(words).capitalize()
+
+    def text(self):
+        return self.random.choice(self.texts)
+
+    def post_rows(self, start, count, started, step):
+        authors = self.popular(count)
+        for offset, author in enumerate(authors):
+            index = start + offset
+            group = None
+            if self.groups and self.random.random() < 0.8:
+                group = self.random.randrange(self.groups)
+                self.group_posts[group] += 1
+            self.stats['posts_count'][author] += 1
+            yield Post(
+                pk=self.first_post + index,
+                author_id=self.first_user + author,
+                group_id=None if group is None else self.first_group + group,
+                text=self.text(),
+                pub_date=started + step * index,
+            )
+
+    def comment_rows(self, posts, count, now):
+        indexes = self.random.choices(range(len(posts)), k=count)
+        for index, author in zip(indexes, self.popular(count)):
+            post = posts[index]
+            self.stats['comments_count'][author] += 1
+            post.comment_count += 1
+            delay = min(now - post.pub_date, timedelta(days=7))
+            yield Comment(
+                post_id=post.pk,
+                author_id=self.first_user + author,
+                text=self.text(),
+                created=post.pub_date + delay * self.random.random(),
+            )
+
+    def seed_posts(self):
+        now = timezone.now()
+        started = now - timedelta(days=self.days)
+        step = timedelta(days=self.days) / max(self.posts, 1)
+        for start in range(0, self.posts, self.batch_size):
+            count = min(self.batch_size, self.posts - start)
+            posts = list(self.post_rows(start, count, started, step))
+            comments = list(self.comment_rows(
+                posts, _shares(self.comments, self.posts, start, count), now
+            ))
+            with transaction.atomic():
+                Post.objects.bulk_create(posts)
+                Comment.objects.bulk_create(comments)
+            self.forget_queries()
+            self.log(f'Постов: {start + count} из {self.posts}')
+
+    def seed_stats(self):
+        for batch in _batches(range(self.users), self.batch_size):
+            self.save(AuthorStats, [
+                AuthorStats(
+                    user_id=self.first_user + i,
+                    **{name: values[i] for name, values in self.stats.items()}
+                )
+                for i in batch
+            ])
+        groups = Group.objects.in_bulk(
+            range(self.first_group, self.first_group + self.groups)
+        )
+        for i, count in enumerate(self.group_posts):
+            groups[self.first_group + i].posts_count = count
+        Group.objects.bulk_update(groups.values(), ['posts_count'])
+
+    def reset_sequences(self):
+        # id назначены явно: PostgreSQL и другие СУБД с последовательностями
+        # иначе выдали бы следующей записи уже занятый id
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [User, Group, Post, Comment]
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def build_timelines(first_user, batch_size=1000):
+    """
+    Раскладывает посты по лентам подписчиков с id от first_user.
+
+    Один INSERT ... SELECT на пачку подписчиков: строки лент не проходят
+    через Python.
+    """
+    follow = Follow._meta.db_table
+    post = Post._meta.db_table
+    entry = TimelineEntry._meta.db_table
+    last_user = User.objects.aggregate(last=Max('pk'))['last'] or 0
+    inserted = 0
+    for start in range(first_user, last_user + 1, batch_size):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {entry} (user_id, post_id, pub_date) '
+                f'SELECT f.user_id, p.id, p.pub_date FROM {follow} f '
+                f'INNER JOIN {post} p ON p.author_id = f.author_id '
+                f'WHERE f.user_id >= %s AND f.user_id < %s',
+                [start, start + batch_size],
+            )
+            inserted += cursor.rowcount
+    return inserted
@@ -0,0 +1,163 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import cache, counters, search, thumbnails, timeline
+from .models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# id постов, которые этот поток сейчас удаляет: их комментарии уходят
+# каскадом, и пересчитывать сам пост на каждый из них незачем
+_deleting = threading.local()
+
+# Поля пользователя, которые видны в лентах: имя и ссылка на профиль
+USER_DISPLAY_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+def _deleting_posts():
+    if not hasattr(_deleting, 'posts'):
+        _deleting.posts = set()
+    return _deleting.posts
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, update_fields=None, raw=False,
+                 **kwargs):
+    # Вход сохраняет только last_login: ленты от него не меняются
+    if created or raw or (
+        update_fields is not None
+        and not USER_DISPLAY_FIELDS & set(update_fields)
+    ):
+        return
+    group_ids = Post.objects.filter(author=instance).exclude(
+        group=None
+    ).values_list('group_id', flat=True).distinct()
+    cache.bump(
+        cache.INDEX,
+        cache.author_scope(instance.pk),
+        *[cache.group_scope(group_id) for group_id in group_ids],
+    )
+
+
+@receiver(pre_save, sender=Post)
+def post_remember_group(sender, instance, **kwargs):
+    # Запоминаем прежнюю группу, чтобы перенести счётчик при смене группы
+    if instance.pk is not None and not instance._state.adding:
+        instance._old_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_published(sender, instance, created, **kwargs):
+    cache.bump(
+        cache.INDEX,
+        cache.author_scope(instance.author_id),
+        cache.group_scope(instance.group_id),
+    )
+    search.index_post(instance.pk)
+    if instance.image:
+        thumbnails.schedule(instance.image.name)
+    if created:
+        timeline.fan_out([instance])
+        counters.change_user(instance.author_id, posts_count=1)
+        counters.change_group(instance.group_id, 1)
+        return
+    old_group_id = getattr(instance, '_old_group_id', instance.group_id)
+    if old_group_id != instance.group_id:
+        cache.bump(cache.group_scope(old_group_id))
+        counters.change_group(old_group_id, -1)
+        counters.change_group(instance.group_id, 1)
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    _deleting_posts().add(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    _deleting_posts().discard(instance.pk)
+    cache.bump(
+        cache.INDEX,
+        cache.author_scope(instance.author_id),
+        cache.group_scope(instance.group_id),
+        cache.comments_scope(instance.pk),
+    )
+    search.remove_post(instance.pk)
+    counters.change_user(instance.author_id, posts_count=-1)
+    counters.change_group(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    cache.bump(cache.GROUPS)
+
+
+def _comment_scopes(comment):
+    """Комментарии поста и ленты, где видно их число."""
+    author_id, group_id = Post.objects.filter(
+        pk=comment.post_id
+    ).values_list('author_id', 'group_id').first() or (None, None)
+    return (
+        cache.comments_scope(comment.post_id),
+        cache.INDEX,
+        cache.author_scope(author_id),
+        cache.group_scope(group_id),
+    )
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    search.index_comment(instance)
+    if created:
+        counters.change_user(instance.author_id, comments_count=1)
+        counters.change_post(instance.post_id, 1)
+        cache.bump(*_comment_scopes(instance))
+    else:
+        cache.bump(cache.comments_scope(instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    search.remove_comment(instance.pk)
+    counters.change_user(instance.author_id, comments_count=-1)
+    if instance.post_id in _deleting_posts():
+        # Счётчик поста уходит вместе с ним, кеш сбросит post_deleted
+        return
+    counters.change_post(instance.post_id, -1)
+    cache.bump(*_comment_scopes(instance))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill(instance.user_id, instance.author_id)
+        counters.change_user(instance.author_id, followers_count=1)
+        counters.change_user(instance.user_id, following_count=1)
+        cache.bump(
+            cache.profile_scope(instance.author_id),
+            cache.profile_scope(instance.user_id),
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    timeline.prune(instance.user_id, instance.author_id)
+    counters.change_user(instance.author_id, followers_count=-1)
+    counters.change_user(instance.user_id, following_count=-1)
+    cache.bump(
+        cache.profile_scope(instance.author_id),
+        cache.profile_scope(instance.user_id),
+    )
@@ -0,0 +1,161 @@
+"""
+Стеммер русского языка по алгоритму Snowball (Портера).
+
+https://snowballstem.org/algorithms/russian/stemmer.html
+
+В FTS5 нет русского стеммера, поэтому тексты постов и поисковые запросы
+приводятся к основам здесь, а в индекс попадают уже основы слов.
+"""
+import re
+from functools import lru_cache
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ('ся', 'сь')
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+    'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+    'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+    'ья', 'я',
+)
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+WORD_RE = re.compile(r'\w+')
+
+
+def _by_length(endings):
+    return tuple(sorted(endings, key=len, reverse=True))
+
+
+def _grouped(groups):
+    """Окончания первой группы должны идти после «а» или «я»."""
+    first, second = groups
+    return _by_length(
+        [(ending, True) for ending in first]
+        + [(ending, False) for ending in second]
+    )
+
+
+PERFECTIVE_GERUND = _grouped(PERFECTIVE_GERUND)
+PARTICIPLE = _grouped(PARTICIPLE)
+VERB = _grouped(VERB)
+ADJECTIVE = _by_length(ADJECTIVE)
+REFLEXIVE = _by_length(REFLEXIVE)
+NOUN = _by_length(NOUN)
+SUPERLATIVE = _by_length(SUPERLATIVE)
+DERIVATIONAL = _by_length(DERIVATIONAL)
+
+
+def _strip(word, endings):
+    for ending in endings:
+        if word.endswith(ending):
+            return word[:-len(ending)]
+    return None
+
+
+def _strip_grouped(word, endings):
+    for ending, after_a in endings:
+        if word.endswith(ending):
+            rest = word[:-len(ending)]
+            if not after_a or rest[-1:] in ('а', 'я'):
+                return rest
+    return None
+
+
+def _regions(word):
+    """Возвращает начала областей RV и R2."""
+    rv = r1 = r2 = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, len(word)):
+        if word[i - 1] in VOWELS and word[i] not in VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i - 1] in VOWELS and word[i] not in VOWELS:
+            r2 = i + 1
+            break
+    return rv, r2
+
+
+def _strip_adjectival(word):
+    rest = _strip(word, ADJECTIVE)
+    if rest is None:
+        return None
+    participle = _strip_grouped(rest, PARTICIPLE)
+    return rest if participle is None else participle
+
+
+# Частые слова встречаются в каждом тексте: основа считается один раз
+@lru_cache(maxsize=2 ** 16)
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    rv, r2 = _regions(word)
+    head, tail = word[:rv], word[rv:]
+    r2 = max(r2 - rv, 0)
+
+    # Шаг 1
+    rest = _strip_grouped(tail, PERFECTIVE_GERUND)
+    if rest is None:
+        rest = _strip(tail, REFLEXIVE)
+        if rest is not None:
+            tail = rest
+        for strip in (
+            _strip_adjectival,
+            lambda value: _strip_grouped(value, VERB),
+            lambda value: _strip(value, NOUN),
+        ):
+            rest = strip(tail)
+            if rest is not None:
+                break
+    if rest is not None:
+        tail = rest
+
+    # Шаг 2
+    if tail.endswith('и'):
+        tail = tail[:-1]
+
+    # Шаг 3
+    if len(tail) > r2:
+        rest = _strip(tail[r2:], DERIVATIONAL)
+        if rest is not None:
+            tail = tail[:r2] + rest
+
+    # Шаг 4
+    if tail.endswith('нн'):
+        tail = tail[:-1]
+    else:
+        rest = _strip(tail, SUPERLATIVE)
+        if rest is not None:
+            tail = rest[:-1] if rest.endswith('нн') else rest
+        elif tail.endswith('ь'):
+            tail = tail[:-1]
+    return head + tail
+
+
+def stems(text):
+    """Разбивает текст на слова и приводит каждое к основе."""
+    return [stem(word) for word in WORD_RE.findall(text or '')]
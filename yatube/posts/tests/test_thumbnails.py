@@ -0,0 +1,143 @@
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+# Как в шаблонах лент
+TEMPLATE = (
+    '{% load thumbnail %}'
+    '{% thumbnail image "960x339" crop="center" upscale=True as im %}'
+    '{{ im.url }}'
+    '{% endthumbnail %}'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTest(TestCase):
+    """Миниатюры строятся вне запроса, запрос их только ищет."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # KV-хранилище sorl держит записи и в кеше
+        cache.clear()
+        with mock.patch.object(thumbnails, 'schedule'):
+            self.post = Post.objects.create(
+                text='Пост с картинкой',
+                author=self.author,
+                image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+            )
+        self.name = self.post.image.name
+
+    def thumbnail_files(self):
+        return [
+            default.backend.thumbnail_file(
+                self.post.image, geometry, **dict(options)
+            )
+            for geometry, options in settings.POST_THUMBNAILS
+        ]
+
+    def render(self):
+        return Template(TEMPLATE).render(Context({'image': self.post.image}))
+
+    def test_template_falls_back_to_original(self):
+        """
+        Пока миниатюры нет, шаблон получает исходную картинку, а миниатюра
+        ставится в очередь, а не строится в запросе.
+        """
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            with mock.patch.object(
+                ThumbnailBackend, '_create_thumbnail'
+            ) as create:
+                url = self.render()
+        self.assertEqual(url, self.post.image.url)
+        create.assert_not_called()
+        schedule.assert_called_once()
+        self.assertEqual(schedule.call_args[0][0], self.name)
+
+    def test_template_uses_generated_thumbnail(self):
+        thumbnails.generate(self.name)
+        for thumbnail in self.thumbnail_files():
+            with self.subTest(thumbnail=thumbnail.name):
+                self.assertTrue(thumbnail.exists())
+                self.assertEqual(self.render(), thumbnail.url)
+
+    def test_post_save_schedules_thumbnails(self):
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            self.post.text = 'Исправленный текст'
+            self.post.save()
+        schedule.assert_called_once_with(self.name)
+
+    def test_schedule_waits_for_commit(self):
+        """Очередь получает картинку только после фиксации транзакции."""
+        callbacks = []
+        with mock.patch.object(
+            thumbnails.transaction, 'on_commit', callbacks.append
+        ), mock.patch.object(thumbnails, '_submit') as submit:
+            thumbnails.schedule(self.name)
+            submit.assert_not_called()
+            for callback in callbacks:
+                callback()
+        submit.assert_called_once_with(self.name, None)
+
+    def test_pool_builds_in_background(self):
+        """Пул потоков строит миниатюры и снимает картинку с очереди."""
+        done = threading.Event()
+        calls = []
+
+        def generate(name, thumbnail_list):
+            calls.append((name, threading.current_thread().name))
+            done.set()
+
+        with mock.patch.object(thumbnails, 'generate', generate):
+            thumbnails._submit(self.name, None)
+            self.assertTrue(done.wait(5))
+        self.assertEqual(calls[0][0], self.name)
+        self.assertTrue(calls[0][1].startswith('thumbnails'))
+
+    def test_rethumbnail_rebuilds_existing(self):
+        """Команда rethumbnail перестраивает и уже готовые миниатюры."""
+        thumbnails.generate(self.name)
+        thumbnail = self.thumbnail_files()[0]
+        with open(thumbnail.storage.path(thumbnail.name), 'wb') as stale:
+            stale.write(b'stale')
+        out = StringIO()
+        call_command('rethumbnail', processes=1, stdout=out)
+        self.assertIn('Готово картинок: 1, с ошибками: 0', out.getvalue())
+        with open(thumbnail.storage.path(thumbnail.name), 'rb') as rebuilt:
+            self.assertNotEqual(rebuilt.read(), b'stale')
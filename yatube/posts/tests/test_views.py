@@ -1,16 +1,26 @@
 import shutil
 import tempfile
+from io import StringIO
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from http import HTTPStatus
+from rest_framework.test import APIClient
 
-from ..models import Follow, Group, Post
+from ..management.commands.explain_queries import bad_plan
+from .. import cache as post_cache
+from .. import post_page, search, viewcounts
+from ..models import (AuthorStats, Comment, Follow, Group, Post,
+                      TimelineEntry)
 
 User = get_user_model()
 
@@ -230,6 +240,72 @@ class PostPagesTest(TestCase):
         )
         self.assertNotIn(post.text, response.content.decode())
 
+    def test_cached_pages_show_new_post(self):
+        """Новый пост сразу виден на закешированных страницах лент."""
+        cache.clear()
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author.username})
+        )
+        for page in pages:
+            self.guest_client.get(page)
+        post = Post.objects.create(
+            author=self.author,
+            group=self.group,
+            text='Свежий пост'
+        )
+        for page in pages:
+            with self.subTest(page=page):
+                response = self.guest_client.get(page)
+                self.assertIn(post.text, response.content.decode())
+
+    def test_cached_feeds_follow_group_and_author_changes(self):
+        """
+        Новое название и адрес группы и новое имя автора сразу видны
+        в закешированных фрагментах лент.
+        """
+        cache.clear()
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author.username})
+        )
+        for page in pages:
+            self.authorized_client.get(page)
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Новое название'
+        group.slug = 'new-slug'
+        group.save()
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Новое'
+        author.last_name = 'Имя'
+        author.save()
+        pages = pages[:1] + (
+            reverse('posts:group_list', kwargs={'slug': 'new-slug'}),
+        ) + pages[2:]
+        for page in pages:
+            with self.subTest(page=page):
+                content = self.authorized_client.get(page).content.decode()
+                self.assertIn('Новое Имя', content)
+                if page != pages[1]:
+                    self.assertIn('/group/new-slug/', content)
+                self.assertNotIn('/group/test-slug/', content)
+
+    def test_login_keeps_feed_versions(self):
+        """Вход пользователя (запись last_login) не сбрасывает ленты."""
+        versions = [
+            post_cache.get_version(scope)
+            for scope in (post_cache.INDEX,
+                          post_cache.author_scope(self.author.pk))
+        ]
+        Client().force_login(self.author)
+        self.assertEqual(versions, [
+            post_cache.get_version(scope)
+            for scope in (post_cache.INDEX,
+                          post_cache.author_scope(self.author.pk))
+        ])
+
     def test_follow(self):
         """
         Авторизованный пользователь
@@ -306,6 +382,74 @@ class PostPagesTest(TestCase):
         )
         self.assertNotIn(post, response.context['page_obj'])
 
+    def test_follow_page_backfilled_and_pruned(self):
+        """
+        После подписки в ленте появляются прежние записи автора,
+        после отписки они из ленты пропадают.
+        """
+        self.authorized_client.post(
+            reverse('posts:profile_follow', kwargs={'username': self.author})
+        )
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertIn(self.post, response.context['page_obj'])
+        self.authorized_client.post(
+            reverse('posts:profile_unfollow', kwargs={'username': self.author})
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.user).exists()
+        )
+
+    def test_rebuild_timelines_command(self):
+        """Команда rebuild_timelines восстанавливает ленту подписок."""
+        Follow.objects.create(user=self.user, author=self.author)
+        TimelineEntry.objects.filter(user=self.user).delete()
+        call_command('rebuild_timelines', self.user.username, stdout=StringIO())
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.user, post=self.post
+            ).exists()
+        )
+
+    def test_counters_follow_changes(self):
+        """Счётчики автора и группы меняются вместе с записями."""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(
+            author=self.author, text='Текст поста', group=self.group
+        )
+        self.author.stats.refresh_from_db()
+        self.group.refresh_from_db()
+        self.assertEqual(self.author.stats.posts_count, 2)
+        self.assertEqual(self.author.stats.followers_count, 1)
+        self.assertEqual(self.group.posts_count, 2)
+        post.delete()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+
+    def test_counters_in_write_transaction(self):
+        """Сбой при сдвиге счётчика откатывает и саму запись."""
+        comments = Comment.objects.count()
+        with mock.patch(
+            'posts.counters.change_post', side_effect=DatabaseError
+        ):
+            with self.assertRaises(DatabaseError):
+                Comment.objects.create(
+                    post=self.post, author=self.user, text='Текст'
+                )
+        self.assertEqual(Comment.objects.count(), comments)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.user).comments_count, 0
+        )
+
+    def test_reconcile_counters_command(self):
+        """Команда reconcile_counters выравнивает разъехавшиеся счётчики."""
+        AuthorStats.objects.filter(user=self.author).update(posts_count=42)
+        Group.objects.filter(pk=self.group.pk).update(posts_count=0)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 1
+        )
+        self.assertEqual(Group.objects.get(pk=self.group.pk).posts_count, 1)
+
 
 class PaginatorViewsTest(TestCase):
     @classmethod
@@ -330,6 +474,8 @@ class PaginatorViewsTest(TestCase):
         cls.second_page_objs = 3
 
     def setUp(self):
+        # bulk_create не сдвигает версии кеша: убираем страницы прошлых тестов
+        cache.clear()
         self.client = Client()
 
     def test_first_page_contains_ten_records(self):
@@ -361,3 +507,671 @@ class PaginatorViewsTest(TestCase):
                     len(response.context['page_obj']),
                     self.second_page_objs
                 )
+
+    def test_cursor_pages(self):
+        """Курсорные ссылки ведут на следующую и предыдущую страницы."""
+        pages_names = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author.username})
+        )
+        for page in pages_names:
+            with self.subTest(page=page):
+                first_page = self.client.get(page).context['page_obj']
+                self.assertFalse(first_page.has_previous())
+                second_page = self.client.get(
+                    page, {'cursor': first_page.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(len(second_page), self.second_page_objs)
+                self.assertFalse(second_page.has_next())
+                previous_page = self.client.get(
+                    page, {'cursor': second_page.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(previous_page), list(first_page))
+
+    def test_broken_cursor_shows_first_page(self):
+        """Испорченный курсор открывает первую страницу."""
+        response = self.client.get(
+            reverse('posts:index'), {'cursor': 'broken'}
+        )
+        self.assertEqual(
+            len(response.context['page_obj']),
+            self.first_page_objs
+        )
+
+
+class QueryBudgetTest(TestCase):
+    """Число запросов на страницу ленты не растёт с числом постов."""
+    # Сессия, пользователь, объекты страницы (автор, группа, счётчики,
+    # подписка) и одна выборка постов вместе с авторами и группами
+    QUERY_BUDGET = 6
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(15):
+            Post.objects.create(
+                text=f'Тестовый текст {i}',
+                author=cls.author,
+                group=cls.group,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_feed_pages_query_budget(self):
+        pages_names = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author.username}),
+            reverse('posts:follow_index'),
+        )
+        for page in pages_names:
+            with self.subTest(page=page):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(page)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertLessEqual(
+                    len(queries), self.QUERY_BUDGET,
+                    '\n'.join(query['sql'] for query in queries)
+                )
+
+    def test_warm_fragment_skips_posts_query(self):
+        """
+        Пока фрагмент ленты в кеше, посты страницы не выбираются:
+        остаются сессия и пользователь (и группа для её страницы).
+        """
+        second_page = self.client.get(
+            reverse('posts:index')
+        ).context['page_obj'].next_cursor
+        for url, queries in (
+            (reverse('posts:index'), 2),
+            (reverse('posts:index') + f'?cursor={second_page}', 2),
+            (reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+             3),
+        ):
+            with self.subTest(url=url):
+                self.client.get(url)
+                with self.assertNumQueries(queries):
+                    response = self.client.get(url)
+                self.assertContains(response, 'Тестовый текст')
+
+
+class AnonymousPageCacheTest(TestCase):
+    """Страницы для анонимов отдаются из кеша и сбрасываются при записи."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+
+    def warm(self, url):
+        # Первый запрос узнаёт, от чего зависит страница, второй кеширует
+        self.guest_client.get(url)
+        self.guest_client.get(url)
+
+    def test_warm_pages_do_not_touch_db(self):
+        pages_names = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author.username}),
+            self.detail_url,
+        )
+        for page in pages_names:
+            with self.subTest(page=page):
+                self.warm(page)
+                with self.assertNumQueries(0):
+                    response = self.guest_client.get(page)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertIn('Тестовый текст', response.content.decode())
+                self.assertIn('Cookie', response['Vary'])
+
+    def test_unknown_params_bypass_cache(self):
+        """Посторонние параметры и кривые значения не заводят записей."""
+        url = reverse('posts:index')
+        for query in ('?x=1', '?page=abc', '?cursor=a&cursor=b'):
+            with self.subTest(query=query):
+                self.warm(url + query)
+                response = self.guest_client.get(url + query)
+                self.assertIsNotNone(response.context)
+                self.assertFalse(response.has_header('ETag'))
+        self.warm(url + '?page=1')
+        with self.assertNumQueries(0):
+            self.guest_client.get(url + '?page=1')
+
+    def test_logged_in_users_bypass_cache(self):
+        self.warm(reverse('posts:index'))
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertIsNotNone(response.context)
+
+    def test_post_create_purges_index(self):
+        self.warm(reverse('posts:index'))
+        self.author_client.post(
+            reverse('posts:post_create'), data={'text': 'Новый пост'}
+        )
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertIn('Новый пост', response.content.decode())
+
+    def test_post_edit_purges_post_detail(self):
+        self.warm(self.detail_url)
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Исправленный текст'},
+        )
+        response = self.guest_client.get(self.detail_url)
+        self.assertIn('Исправленный текст', response.content.decode())
+
+    def test_add_comment_purges_post_detail(self):
+        self.warm(self.detail_url)
+        self.author_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Новый комментарий'},
+        )
+        response = self.guest_client.get(self.detail_url)
+        self.assertIn('Новый комментарий', response.content.decode())
+
+
+class ConditionalPagesTest(TestCase):
+    """Страницы отдают ETag и Last-Modified и отвечают 304."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст', author=cls.author, group=cls.group
+        )
+        cls.pages_names = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.author.username}),
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.pk}),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def validators(self, client, url):
+        # Первый запрос узнаёт, от чего зависит страница
+        client.get(url)
+        response = client.get(url)
+        return response['ETag'], response.get('Last-Modified')
+
+    def test_not_modified(self):
+        for client in (self.guest_client, self.author_client):
+            for page in self.pages_names:
+                with self.subTest(page=page):
+                    etag, _ = self.validators(client, page)
+                    response = client.get(page, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(
+                        response.status_code, HTTPStatus.NOT_MODIFIED
+                    )
+
+    def test_last_modified_only_for_anonymous(self):
+        """
+        Last-Modified не различает пользователей: вошедшему его не отдают
+        и по одному If-Modified-Since не отвечают 304.
+        """
+        for page in self.pages_names:
+            with self.subTest(page=page):
+                _, last_modified = self.validators(self.guest_client, page)
+                response = self.guest_client.get(
+                    page, HTTP_IF_MODIFIED_SINCE=last_modified
+                )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+                etag, own = self.validators(self.author_client, page)
+                self.assertIsNone(own)
+                response = self.author_client.get(
+                    page, HTTP_IF_MODIFIED_SINCE=last_modified
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_scopes_shared_by_cursors(self):
+        """Области страницы запоминаются по пути, а не по курсору."""
+        page = self.pages_names[0]
+        self.guest_client.get(page)
+        response = self.guest_client.get(page + '?cursor=abc')
+        self.assertTrue(response.has_header('ETag'))
+
+    def test_anonymous_not_modified_without_db(self):
+        page = self.pages_names[1]
+        etag, _ = self.validators(self.guest_client, page)
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(page, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_etag_depends_on_user(self):
+        page = self.pages_names[0]
+        guest_etag, _ = self.validators(self.guest_client, page)
+        author_etag, _ = self.validators(self.author_client, page)
+        self.assertNotEqual(guest_etag, author_etag)
+
+    def test_comment_changes_etag(self):
+        page = self.pages_names[3]
+        etag, _ = self.validators(self.guest_client, page)
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Комментарий'
+        )
+        response = self.guest_client.get(page, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class ViewCountsTest(TestCase):
+    """Просмотры копятся в памяти и пишутся в базу пачками."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.post = Post.objects.create(text='Тестовый текст', author=cls.author)
+        cls.other = Post.objects.create(text='Другой пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        # Просмотры, накопленные другими тестами
+        viewcounts.take()
+        self.guest_client = Client()
+
+    def view(self, post, times=1):
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        for _ in range(times):
+            self.guest_client.get(url)
+
+    def views(self, post):
+        return Post.objects.values_list('views', flat=True).get(pk=post.pk)
+
+    def test_views_are_buffered_and_flushed_once(self):
+        self.view(self.post, 3)
+        self.view(self.other, 2)
+        self.assertEqual(self.views(self.post), 0)
+        self.assertEqual(viewcounts.pending(self.post.pk), 3)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(viewcounts.flush(), 5)
+        updates = [q for q in queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.views(self.post), 3)
+        self.assertEqual(self.views(self.other), 2)
+        self.assertEqual(viewcounts.pending(self.post.pk), 0)
+
+    @override_settings(VIEW_COUNTS_FLUSH_THRESHOLD=2)
+    def test_flush_at_threshold(self):
+        self.view(self.post, 2)
+        self.assertEqual(self.views(self.post), 2)
+
+    def test_post_edit_keeps_views(self):
+        Post.objects.filter(pk=self.post.pk).update(views=5)
+        post = Post.objects.get(pk=self.post.pk)
+        Post.objects.filter(pk=self.post.pk).update(views=7)
+        post.text = 'Исправленный текст'
+        post.save()
+        self.assertEqual(self.views(self.post), 7)
+
+    def test_views_in_page_and_api(self):
+        Post.objects.filter(pk=self.post.pk).update(views=5)
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        self.assertEqual(response.context['views'], 5)
+        client = APIClient()
+        client.force_authenticate(self.author)
+        response = client.get(
+            reverse('api:post-detail', args=[self.post.pk])
+        )
+        self.assertEqual(response.data['views'], 5)
+
+    def test_views_never_go_down_after_flush(self):
+        """Просмотр, запись в базу, просмотр: число на странице не падает."""
+        client = Client()
+        client.force_login(self.author)
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        shown = []
+        for _ in range(3):
+            shown.append(client.get(url).context['views'])
+        viewcounts.flush()
+        shown.append(client.get(url).context['views'])
+        self.view(self.post)
+        viewcounts.flush()
+        shown.append(client.get(url).context['views'])
+        self.assertEqual(shown, [0, 1, 2, 3, 5])
+
+    def test_warm_post_page_reads_views_from_cache(self):
+        """Число просмотров не стоит запросов к БД, пока страница в кеше."""
+        client = Client()
+        client.force_login(self.author)
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        client.get(url)
+        # Сессия и пользователь
+        with self.assertNumQueries(2):
+            response = client.get(url)
+        self.assertEqual(response.context['views'], 1)
+
+    def test_flush_purges_cached_post_page(self):
+        """
+        После записи просмотров анонимы видят новое число, а старый ETag
+        страницы поста больше не даёт 304.
+        """
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.view(self.post, 2)
+        etag = self.guest_client.get(url)['ETag']
+        self.view(self.post, 5)
+        viewcounts.flush()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('<span>8</span>', response.content.decode())
+
+    def test_flush_changes_api_etag(self):
+        """После записи просмотров API не отвечает 304 со старым числом."""
+        client = APIClient()
+        client.force_authenticate(self.author)
+        url = reverse('api:post-detail', args=[self.post.pk])
+        etag = client.get(url)['ETag']
+        self.view(self.post, 3)
+        viewcounts.flush()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.data['views'], 3)
+
+
+class PostPageCacheTest(TestCase):
+    """Страница поста собирается один раз и сбрасывается при записи."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст', author=cls.author, group=cls.group
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.author, text='Комментарий'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_cache_hit_makes_no_queries(self):
+        post_page.get(self.post.pk)
+        with self.assertNumQueries(0):
+            page = post_page.get(self.post.pk)
+            self.assertEqual(page.post.author.username, 'Author')
+            self.assertEqual(page.post.group.title, 'Тестовая группа')
+            self.assertEqual(page.post_count, 1)
+            self.assertEqual(
+                [comment.author.username for comment in page.comments],
+                ['Author'],
+            )
+
+    def test_missing_post(self):
+        self.assertIsNone(post_page.get(0))
+
+    def test_add_comment_invalidates(self):
+        post_page.get(self.post.pk)
+        self.author_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Новый комментарий'},
+        )
+        page = post_page.get(self.post.pk)
+        self.assertEqual(len(page.comments), 2)
+
+    def test_post_edit_invalidates(self):
+        post_page.get(self.post.pk)
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Исправленный текст'},
+        )
+        page = post_page.get(self.post.pk)
+        self.assertEqual(page.post.text, 'Исправленный текст')
+        self.assertIsNone(page.post.group)
+
+    def test_api_comment_writes_invalidate(self):
+        client = APIClient()
+        client.force_authenticate(self.author)
+        url = reverse('api:comment-list', args=[self.post.pk])
+        post_page.get(self.post.pk)
+        response = client.post(url, {'text': 'Через API'})
+        self.assertEqual(len(post_page.get(self.post.pk).comments), 2)
+        client.delete(
+            reverse('api:comment-detail', args=[self.post.pk,
+                                                response.data['id']])
+        )
+        self.assertEqual(len(post_page.get(self.post.pk).comments), 1)
+
+
+class CommentPagesTest(TestCase):
+    """Комментарии листаются по ключу, их число хранится в посте."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.post = Post.objects.create(text='Тестовый текст', author=cls.author)
+        for i in range(25):
+            Comment.objects.create(
+                post=cls.post, author=cls.author, text=f'Комментарий {i}'
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+
+    def comment_count(self):
+        return Post.objects.values_list(
+            'comment_count', flat=True
+        ).get(pk=self.post.pk)
+
+    def test_comments_are_paginated(self):
+        response = self.author_client.get(self.url)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), settings.COMMENTS_PER_PAGE)
+        self.assertEqual(comments[0].text, 'Комментарий 0')
+        response = self.author_client.get(
+            self.url, {'cursor': comments.next_cursor}
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), 5)
+        self.assertFalse(comments.has_next())
+
+    def test_comment_count_follows_changes(self):
+        self.assertEqual(self.comment_count(), 25)
+        self.author_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Ещё один'},
+        )
+        self.assertEqual(self.comment_count(), 26)
+        Comment.objects.filter(post=self.post)[0].delete()
+        self.assertEqual(self.comment_count(), 25)
+
+    def test_comment_count_on_feed(self):
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Комментариев: 25')
+
+    def test_reconcile_comment_counts(self):
+        Post.objects.filter(pk=self.post.pk).update(comment_count=3)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(self.comment_count(), 25)
+
+
+class SearchViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.cats = Post.objects.create(
+            author=cls.author, text='Пишу про красивых котиков'
+        )
+        cls.dogs = Post.objects.create(
+            author=cls.author, text='Собаки лучше всех'
+        )
+        Comment.objects.create(
+            post=cls.dogs, author=cls.author, text='А котики?'
+        )
+        Post.objects.create(author=cls.author, text='Просто текст')
+
+    def setUp(self):
+        self.client = Client()
+
+    def search(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+        return response.context['page_obj']
+
+    def test_search_finds_word_forms(self):
+        """Поиск находит посты по другим формам слова."""
+        self.assertEqual(list(self.search('красивый кот')), [self.cats])
+
+    def test_search_ranks_post_text_above_comments(self):
+        """Совпадение в тексте поста выше совпадения в комментарии."""
+        self.assertEqual(list(self.search('котик')), [self.cats, self.dogs])
+
+    def test_search_index_follows_changes(self):
+        """Индекс обновляется при правке и удалении поста."""
+        cats = Post.objects.get(pk=self.cats.pk)
+        cats.text = 'Теперь про попугаев'
+        cats.save()
+        self.assertEqual(list(self.search('попугай')), [cats])
+        self.assertEqual(list(self.search('котик')), [self.dogs])
+        Post.objects.filter(pk=self.dogs.pk).delete()
+        self.assertEqual(list(self.search('котик')), [])
+
+    def test_comment_indexed_alone(self):
+        """
+        Запись комментария меняет только его строку индекса и не читает
+        остальные комментарии поста; удаление поста не пересчитывает пост
+        на каждый комментарий.
+        """
+        for i in range(3):
+            Comment.objects.create(
+                post=self.dogs, author=self.author, text=f'Лапы {i}'
+            )
+        with CaptureQueriesContext(connection) as queries:
+            comment = Comment.objects.create(
+                post=self.dogs, author=self.author, text='Про попугаев'
+            )
+        self.assertFalse([
+            query for query in queries
+            if query['sql'].startswith('SELECT')
+            and '"posts_comment"' in query['sql']
+        ])
+        self.assertEqual(list(self.search('попугай')), [self.dogs])
+        comment.text = 'Про хомяков'
+        comment.save()
+        self.assertEqual(list(self.search('попугай')), [])
+        self.assertEqual(list(self.search('хомяк')), [self.dogs])
+        with CaptureQueriesContext(connection) as queries:
+            Post.objects.get(pk=self.dogs.pk).delete()
+        self.assertFalse([
+            query for query in queries
+            if query['sql'].startswith('UPDATE "posts_post"')
+        ])
+        self.assertEqual(list(self.search('хомяк')), [])
+
+    def test_filter_posts_subquery(self):
+        """Фильтр админки подставляет индекс подзапросом."""
+        with self.assertNumQueries(1):
+            found = set(search.filter_posts(Post.objects.all(), 'котик'))
+        self.assertEqual(found, {self.cats, self.dogs})
+
+    def test_search_cursor_pages(self):
+        """Результаты поиска листаются курсором."""
+        for i in range(settings.PAGES + 2):
+            Post.objects.create(author=self.author, text=f'Котики {i}')
+        first_page = self.search('котики')
+        self.assertEqual(len(first_page), settings.PAGES)
+        second_page = self.search('котики', cursor=first_page.next_cursor)
+        self.assertEqual(len(second_page), 4)
+        self.assertFalse(set(first_page) & set(second_page))
+
+
+class QueryPlansTest(TestCase):
+    def test_hot_queries_use_indexes(self):
+        """Горячие запросы не читают таблицы целиком с сортировкой."""
+        out = StringIO()
+        call_command('explain_queries', '--analyze', stdout=out)
+        self.assertIn('post_feed_idx', out.getvalue())
+        self.assertIn('follow_author_user_idx', out.getvalue())
+
+    def test_bad_plans_detected(self):
+        """Полный просмотр и сортировка мимо индекса — плохие планы."""
+        full_scan = (
+            '3 0 0 SCAN posts_post\n'
+            '10 0 0 USE TEMP B-TREE FOR ORDER BY'
+        )
+        partial_sort = (
+            '7 0 0 SEARCH posts_timelineentry USING INDEX t (user_id=?)\n'
+            '71 0 0 USE TEMP B-TREE FOR RIGHT PART OF ORDER BY'
+        )
+        good = '7 0 0 SCAN posts_post USING INDEX post_feed_idx'
+        self.assertTrue(bad_plan(full_scan))
+        self.assertTrue(bad_plan(partial_sort))
+        self.assertFalse(bad_plan(good))
+
+
+class SeedCommandTest(TestCase):
+    def test_seed_keeps_counters_consistent(self):
+        """Счётчики после seed_yatube совпадают с пересчитанными."""
+        call_command(
+            'seed_yatube', users=30, groups=3, posts=120, comments=200,
+            follows=4, batch_size=50, seed=1, timelines=True,
+            stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Post.objects.count(), 120)
+        self.assertEqual(Comment.objects.count(), 200)
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('пользователей 0, групп 0, постов 0', out.getvalue())
+        follow = Follow.objects.first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=follow.user).count(),
+            Post.objects.filter(
+                author__following__user=follow.user
+            ).count(),
+        )
+        # Новые записи получают свободные id после явно заданных
+        Post.objects.create(author=follow.user, text='После сидинга')
@@ -0,0 +1,131 @@
+"""
+Миниатюры картинок постов готовятся заранее, вне запроса.
+
+Тег {% thumbnail %} из sorl-thumbnail по умолчанию декодирует и
+масштабирует картинку прямо в запросе первого зрителя. Бэкенд
+PregeneratedThumbnailBackend в запросе только ищет готовую миниатюру
+в KV-хранилище sorl; если её ещё нет, шаблон получает исходную картинку,
+а миниатюра ставится в очередь фонового пула потоков. Миниатюры новых
+постов ставятся в очередь сразу после сохранения поста, а все
+миниатюры можно пересобрать командой rethumbnail.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_lock = threading.Lock()
+_pending = set()
+_executor = None
+
+
+class PregeneratedThumbnailBackend(ThumbnailBackend):
+    def _options(self, source, options):
+        # Тот же набор опций, что и в ThumbnailBackend.get_thumbnail,
+        # иначе имя миниатюры не совпадёт с тем, что построит воркер
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return options
+
+    def thumbnail_file(self, file_, geometry_string, **options):
+        """Файл миниатюры (возможно, ещё не построенной)."""
+        source = ImageFile(file_)
+        options = self._options(source, options)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def lookup(self, file_, geometry_string, **options):
+        """Готовая миниатюра из KV-хранилища или None."""
+        return default.kvstore.get(
+            self.thumbnail_file(file_, geometry_string, **options)
+        )
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if getattr(_local, 'generating', False):
+            return super().get_thumbnail(file_, geometry_string, **options)
+        if not file_:
+            raise ValueError('falsey file_ argument in get_thumbnail()')
+        thumbnail = self.lookup(file_, geometry_string, **options)
+        if thumbnail is not None:
+            return thumbnail
+        schedule(file_.name, [(geometry_string, options)])
+        # Пока миниатюры нет, показываем исходную картинку
+        return ImageFile(file_)
+
+
+def generate(name, thumbnails=None, force=False):
+    """
+    Строит миниатюры картинки name; вызывается вне запроса.
+
+    sorl не строит миниатюру, о которой знает KV-хранилище или файл
+    которой уже есть. С force=True и запись, и файл сначала удаляются,
+    и миниатюра строится заново.
+    """
+    _local.generating = True
+    try:
+        for geometry_string, options in thumbnails or settings.POST_THUMBNAILS:
+            source = ImageFile(name, default.storage)
+            if force:
+                thumbnail = default.backend.thumbnail_file(
+                    source, geometry_string, **dict(options)
+                )
+                default.kvstore.delete(thumbnail, delete_thumbnails=False)
+                thumbnail.delete()
+            default.backend.get_thumbnail(
+                source, geometry_string, **dict(options)
+            )
+    finally:
+        _local.generating = False
+
+
+def _run(name, thumbnails, key):
+    try:
+        generate(name, thumbnails)
+    except Exception:
+        logger.exception('Не удалось построить миниатюры %s', name)
+    finally:
+        with _lock:
+            _pending.discard(key)
+        # У потока пула своё соединение с БД (KV-хранилище sorl)
+        connection.close()
+
+
+def _submit(name, thumbnails):
+    global _executor
+    key = (name, repr(thumbnails))
+    with _lock:
+        if key in _pending:
+            return
+        _pending.add(key)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    _executor.submit(_run, name, thumbnails, key)
+
+
+def schedule(name, thumbnails=None):
+    """
+    Ставит построение миниатюр в очередь после фиксации транзакции:
+    до неё воркер может не увидеть ни файла, ни записи о посте.
+    """
+    if not name:
+        return
+    transaction.on_commit(lambda: _submit(name, thumbnails))
@@ -0,0 +1,146 @@
+"""
+Счётчики просмотров постов с отложенной записью.
+
+UPDATE ... SET views = views + 1 на каждый просмотр упирается
+в блокировку записи SQLite и в одну горячую строку популярного поста.
+Здесь просмотры копятся в памяти процесса, а в базу уходят одним
+UPDATE с CASE на все посты сразу: после ответа, если накопилось
+VIEW_COUNTS_FLUSH_THRESHOLD просмотров или с прошлой записи прошло
+VIEW_COUNTS_FLUSH_INTERVAL секунд, и при остановке процесса.
+
+Упавший процесс теряет не больше просмотров, чем накопил с прошлой
+записи. Процессы пишут приращения, а не итог, так что воркеров может
+быть сколько угодно.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DatabaseError, connection, models, transaction
+from django.db.models import Case, F, Value, When
+from django.dispatch import receiver
+
+from . import cache
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Постов в одном UPDATE: по три параметра на пост, SQLite ограничивает их
+# число
+BATCH_SIZE = 300
+
+_lock = threading.Lock()
+_buffer = Counter()
+_total = 0
+_last_flush = time.monotonic()
+# База, для которой накоплены просмотры (тесты подменяют её на время)
+_database = None
+
+
+def _database_name():
+    return connection.settings_dict['NAME']
+
+
+def record(post_id):
+    """Отмечает просмотр поста."""
+    global _total, _database
+    with _lock:
+        if not _total:
+            _database = _database_name()
+        _buffer[post_id] += 1
+        _total += 1
+
+
+def pending(post_id):
+    """Просмотры поста, ещё не записанные в базу этим процессом."""
+    with _lock:
+        return _buffer.get(post_id, 0)
+
+
+def take():
+    """Забирает накопленные приращения {id поста: просмотры}."""
+    global _buffer, _total, _last_flush
+    with _lock:
+        taken, _buffer, _total = _buffer, Counter(), 0
+        _last_flush = time.monotonic()
+    return taken
+
+
+def flush():
+    """Записывает накопленные просмотры одним UPDATE; возвращает их число."""
+    global _total
+    database = _database
+    increments = take()
+    if not increments:
+        return 0
+    if database != _database_name():
+        # База сменилась под процессом (так делает тестовый прогон):
+        # чужие приращения в неё писать нельзя, но и терять молча тоже
+        logger.error(
+            'Просмотры постов (%d) накоплены для базы %s, а не %s; '
+            'они не записаны',
+            sum(increments.values()), database, _database_name(),
+        )
+        return 0
+    items = list(increments.items())
+    try:
+        with transaction.atomic():
+            for start in range(0, len(items), BATCH_SIZE):
+                _update(items[start:start + BATCH_SIZE])
+    except DatabaseError:
+        # Вернём приращения в буфер и попробуем при следующей записи
+        logger.exception('Не удалось записать просмотры постов')
+        with _lock:
+            _buffer.update(increments)
+            _total += sum(increments.values())
+        return 0
+    # Число просмотров видно в API и на странице поста: их ETag
+    # и закешированные страницы должны смениться
+    cache.bump(
+        cache.VIEWS, *[cache.views_scope(pk) for pk in increments]
+    )
+    return sum(increments.values())
+
+
+def _update(items):
+    Post.objects.filter(pk__in=[pk for pk, _ in items]).update(
+        views=F('views') + Case(
+            *[When(pk=pk, then=Value(n)) for pk, n in items],
+            default=Value(0),
+            output_field=models.PositiveIntegerField(),
+        )
+    )
+
+
+def should_flush():
+    return bool(_total) and (
+        _total >= settings.VIEW_COUNTS_FLUSH_THRESHOLD
+        or time.monotonic() - _last_flush
+        >= settings.VIEW_COUNTS_FLUSH_INTERVAL
+    )
+
+
+@receiver(request_finished)
+def flush_after_request(sender, **kwargs):
+    # Ответ уже отдан: запись не задерживает посетителя
+    if should_flush():
+        flush()
+
+
+atexit.register(flush)
+
+
+def counted(view):
+    """Считает просмотр поста post_id для ответов 200 и 304."""
+    @wraps(view)
+    def wrapper(request, post_id, *args, **kwargs):
+        response = view(request, post_id, *args, **kwargs)
+        if request.method == 'GET' and response.status_code in (200, 304):
+            record(post_id)
+        return response
+    return wrapper
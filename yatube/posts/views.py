@@ -2,74 +2,134 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.http import urlencode
 
+from core.paginator import KeysetPaginator
+from . import cache, post_page, viewcounts
+from .pages import cached_page, depends_on
+from .counters import stats_for
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
+from .search import search as search_posts
+from .models import Follow, Group, Post, TimelineEntry
 
 User = get_user_model()
 
 
-def paginate(request, posts, pages):
-    paginator = Paginator(posts, pages)
+def paginate(request, posts, pages, ordering=('-pub_date', '-pk')):
+    posts = posts.order_by(*ordering)
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+    if page_number is not None:
+        # Старые ссылки вида ?page=N продолжают работать через OFFSET
+        return Paginator(posts, pages).get_page(page_number)
+    paginator = KeysetPaginator(posts, pages, ordering=ordering)
+    # Строки читаются в шаблоне, внутри кешируемого фрагмента ленты
+    return paginator.get_lazy_page(request.GET.get('cursor'))
 
 
+@cached_page
 def index(request):
-    post_list = Post.objects.all()
+    depends_on(request, cache.INDEX, cache.GROUPS)
+    post_list = Post.objects.with_related()
     page_obj = paginate(request, post_list, settings.PAGES)
     context = {
         'page_obj': page_obj,
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
+        'cache_version': cache.get_version(cache.INDEX),
+        # Название и адрес группы у каждого поста
+        'groups_version': cache.get_version(cache.GROUPS),
     }
     return render(request, 'posts/index.html', context)
 
 
+@cached_page
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.group_posts.all()
+    depends_on(request, cache.GROUPS, cache.group_scope(group.pk))
+    posts = group.group_posts.with_related()
     page_obj = paginate(request, posts, settings.PAGES)
     context = {
         'group': group,
         'page_obj': page_obj,
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
+        'cache_version': cache.get_version(cache.group_scope(group.pk)),
+        'groups_version': cache.get_version(cache.GROUPS),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@cached_page
 def profile(request, username):
     user = get_object_or_404(User, username=username)
-    user_posts = Post.objects.filter(author__username=username)
-    post_count = user_posts.count()
+    depends_on(
+        request,
+        cache.GROUPS,
+        cache.author_scope(user.pk),
+        cache.profile_scope(user.pk),
+    )
+    user_posts = Post.objects.with_related().filter(author=user)
+    stats = stats_for(user)
     page_obj = paginate(request, user_posts, settings.PAGES)
     following = user.is_authenticated and user.following.exists()
     context = {
         'page_obj': page_obj,
-        'post_count': post_count,
+        'post_count': stats.posts_count,
+        'stats': stats,
         'author': user,
         'following': following,
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
+        'cache_version': cache.get_version(cache.author_scope(user.pk)),
+        'groups_version': cache.get_version(cache.GROUPS),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@viewcounts.counted
+@cached_page
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    author = post.author
-    post_count = author.posts.all().count()  # используем related_name 'posts' поля author модели Post, чтобы получить все экземпляры модели Post автора
+    # Буфер просмотров читается раньше страницы: запись просмотров
+    # между чтениями посчитает их дважды, но число не уменьшится
+    buffered = viewcounts.pending(post_id)
+    # Пост, автор, группа, счётчик постов и комментарии — одним объектом
+    # из кеша, см. posts/post_page.py
+    page = post_page.get(post_id)
+    if page is None:
+        raise Http404('Пост не найден')
+    post = page.post
+    depends_on(request, *page.scopes)
+    cursor = request.GET.get('cursor')
+    comments = (
+        post_page.comments_page(post, cursor) if cursor else page.comments
+    )
     form = CommentForm(
         request.POST or None,
     )
-    comments = post.comments.all()
     context = {
         'post': post,
-        'post_count': post_count,
-        'author': author,
+        'post_count': page.post_count,
+        # Запись просмотров сдвигает views_scope поста, и PostPage
+        # с устаревшим post.views в кеше не остаётся
+        'views': post.views + buffered,
+        'author': post.author,
         'form': form,
         'comments': comments,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = search_posts(query, settings.PAGES, request.GET.get('cursor'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        # Ссылки паджинатора сохраняют поисковый запрос
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -119,8 +179,15 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginate(request, post_list, settings.PAGES)
+    # Лента заранее разложена по подписчикам, см. posts/timeline.py
+    entries = TimelineEntry.objects.filter(
+        user=request.user
+    ).select_related('post__author', 'post__group')
+    # Именно post_id: '-post' сортировал бы по Post.Meta.ordering через JOIN
+    page_obj = paginate(
+        request, entries, settings.PAGES, ordering=('-pub_date', '-post_id')
+    )
+    page_obj.object_list = [entry.post for entry in page_obj]
     context = {
         'page_obj': page_obj,
     }
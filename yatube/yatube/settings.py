@@ -48,29 +48,34 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
     'sorl.thumbnail',
-    'debug_toolbar',
     'rest_framework',
     'rest_framework.authtoken',
-    'api',
+    'api.apps.ApiConfig',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.APICompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+# При DEBUG запросы с этих адресов профилируются всегда (core/middleware.py)
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 
+# Файл метрик на время тестов — во временном каталоге
+TEST_RUNNER = 'core.runner.TestRunner'
+
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
@@ -151,30 +156,116 @@ LOGIN_REDIRECT_URL = 'posts:index'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Миниатюры строятся фоновым пулом, а не в запросе (posts/thumbnails.py)
+THUMBNAIL_BACKEND = 'posts.thumbnails.PregeneratedThumbnailBackend'
+THUMBNAIL_WORKERS = 2
+# Миниатюры, которые шаблоны запрашивают у каждой картинки поста
+POST_THUMBNAILS = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 
-CACHES = {
-    'default': {
+# Бэкенд кеша выбирается переменной окружения YATUBE_CACHE:
+# 'shared' (по умолчанию) — общий для всех воркеров хоста файл SQLite
+# (core/cache.py): версии фрагментов, страницы анонимов, блокировки
+# singleflight и отзыв токенов видны всем процессам;
+# 'locmem' — в памяти процесса, годится только для одного процесса.
+# Тесты всегда идут с 'locmem' (core/runner.py).
+CACHE_BACKENDS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'shared': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'MAX_SIZE': 256 * 2 ** 20,
+        },
+    },
+}
+
+CACHES = {
+    'default': CACHE_BACKENDS[os.environ.get('YATUBE_CACHE', 'shared')],
 }
 
 # Global variables
 PAGES = 10
+COMMENTS_PER_PAGE = 20
+# Фрагменты лент сбрасываются версиями при изменении постов (posts/cache.py)
+FEED_CACHE_TIMEOUT = 60 * 60 * 6
+# Сколько секунд страница для анонимов свежа (posts/pages.py); столько же
+# после этого её отдают устаревшей, пока строится новая
+PAGE_CACHE_TIMEOUT = 60
+# Просмотры постов пишутся в базу пачками (posts/viewcounts.py): после
+# стольких просмотров или раз в столько секунд
+VIEW_COUNTS_FLUSH_THRESHOLD = 1000
+VIEW_COUNTS_FLUSH_INTERVAL = 10
+
+# Доля запросов, для которых core/middleware.py собирает время БД,
+# шаблонов и кеша в заголовок Server-Timing и лог core.profiling
+PROFILING_SAMPLE_RATE = float(
+    os.environ.get('YATUBE_PROFILING_SAMPLE_RATE', 0)
+)
+
+# Метрики Prometheus (core/metrics.py): воркеры раз в
+# METRICS_FLUSH_INTERVAL секунд дописывают их в общий файл SQLite,
+# /metrics/ отдаёт сумму адресам из METRICS_ALLOWED_IPS (по умолчанию —
+# INTERNAL_IPS); пустой список закрывает её для всех. В тестах файл лежит
+# во временном каталоге (core/runner.py)
+METRICS_PATH = os.environ.get(
+    'YATUBE_METRICS_PATH', os.path.join(BASE_DIR, 'metrics.sqlite3')
+)
+METRICS_FLUSH_INTERVAL = 5
+METRICS_ALLOWED_IPS = [
+    ip for ip in os.environ.get('YATUBE_METRICS_ALLOWED_IPS', '').split(',')
+    if ip
+] or INTERNAL_IPS
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
 
 # CSRF handler
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 
+# Наибольшее число постов в одном запросе к /api/v1/posts/bulk/
+API_BULK_MAX_ITEMS = 5000
+
+# Сколько секунд пользователь по токену API живёт в кеше
+API_TOKEN_CACHE_TIMEOUT = 60
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
-    ]
+        'api.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
+
+# Ответы API от такого размера (в байтах) сжимаются gzip или brotli
+API_COMPRESS_MIN_SIZE = 1024
@@ -19,6 +19,7 @@ from django.urls import path, include
 from django.conf.urls.static import static
 
 import api.urls
+import core.views
 
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
@@ -27,15 +28,13 @@ urlpatterns = [
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
     path('api/', include(api.urls)),
+    path('metrics/', core.views.metrics, name='metrics'),
     ]
 
 if settings.DEBUG:
-    import debug_toolbar
-
     urlpatterns += static(
         settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
     )
-    urlpatterns += (path('__debug__/', include(debug_toolbar.urls)),)
 
 
 handler404 = 'core.views.page_not_found'